@@ -0,0 +1,413 @@
+"""Local stand-in for the Meraki Dashboard API, for offline benchmarks.
+
+Serves a deterministic synthetic organization with every endpoint the four
+scripts call: org inventory, networks, uplink settings/statuses, VLANs,
+policy objects, L3 firewall rules, switch ports (per switch and bySwitch),
+action batches and network clients.
+
+- Paginated endpoints honour ``perPage``/``startingAfter`` and return
+  ``Link: <...>; rel=next`` headers like the real API.
+- ``--latency`` adds a delay to every response; ``--endpoint-latency`` overrides
+  it per route (e.g. ``clients=200``).
+- ``--throttle-rate`` enforces a per-org request budget and answers 429 with
+  ``Retry-After`` when it is exceeded; ``--throttle-probability`` injects 429s
+  at random.
+- Network clients carry a ``lastSeen`` spread over the last 14 days, with
+  every tenth client connected right now; ``t0`` and ``timespan`` filter on it
+  like the real API, so ``--incremental`` runs only pull recent clients.
+- ``GET /_stats`` returns request counts per route, 429s and bytes sent;
+  ``POST /_stats/reset`` clears them.
+
+Point a script at it with ``MERAKI_API_BASE_URL=http://127.0.0.1:<port>``.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+SIZES = {"small": 10, "medium": 1000, "large": 10000}
+# One client in ACTIVE_EVERY is seen "now"; the rest are spread over LAST_SEEN_SPREAD seconds
+ACTIVE_EVERY = 10
+LAST_SEEN_SPREAD = 14 * 86400
+SITE_LAYOUT = (("MX", "appliance", 1), ("MS", "switch", 5), ("MR", "wireless", 4))  # per 10 devices
+PORTS_PER_SWITCH = 8
+
+
+def serial_for(model, index):
+    return f"Q2{model}-{index // 10000:04d}-{index % 10000:04d}"
+
+
+class SyntheticOrg:
+    """A deterministic org of `devices` devices, grouped into sites of ten."""
+
+    def __init__(self, devices, clients_per_network=200, org_id="1"):
+        self.org_id = org_id
+        self.clients_per_network = clients_per_network
+        self.created = int(time.time())
+        self.networks = []
+        self.devices = []
+        site = 0
+        while len(self.devices) < devices:
+            net_id = f"N_{site}"
+            self.networks.append({
+                "id": net_id,
+                "organizationId": org_id,
+                "name": f"Site {site:05d}",
+                "productTypes": ["appliance", "switch", "wireless"],
+            })
+            for model, product_type, count in SITE_LAYOUT:
+                for n in range(count):
+                    if len(self.devices) >= devices:
+                        break
+                    index = len(self.devices)
+                    self.devices.append({
+                        "serial": serial_for(model, index),
+                        "name": f"SITE{site:05d}-{model}{n + 1:02d}",
+                        "model": {"MX": "MX68", "MS": "MS225-48", "MR": "MR46"}[model],
+                        "networkId": net_id,
+                        "productType": product_type,
+                        "organizationId": org_id,
+                    })
+            site += 1
+        self.devices_by_serial = {d["serial"]: d for d in self.devices}
+        self.networks_by_id = {n["id"]: n for n in self.networks}
+
+    def by_product(self, product_type):
+        return [d for d in self.devices if d["productType"] == product_type]
+
+    def client(self, net_id, index):
+        site = int(net_id.split("_")[1])
+        mac_index = site * self.clients_per_network + index
+        return {
+            "id": f"k{mac_index}",
+            "mac": ":".join(f"{b:02x}" for b in (0x02, 0, *mac_index.to_bytes(4, "big"))),
+            "description": f"client-{mac_index}",
+            "ip": f"10.{site % 256}.{index // 256}.{index % 256}",
+            "os": ("iOS", "Android", "Windows 10", "macOS", None)[mac_index % 5],
+            # Every third client is wired
+            "ssid": None if index % 3 == 0 else ("Corp", "Guest", "IoT")[mac_index % 3],
+            "lastSeen": self.last_seen(mac_index),
+        }
+
+    def last_seen(self, mac_index):
+        if mac_index % ACTIVE_EVERY == 0:
+            return int(time.time())
+        return self.created - (mac_index * 7919) % LAST_SEEN_SPREAD
+
+
+class MockState:
+    def __init__(self, org, args):
+        self.org = org
+        self.args = args
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.bytes_sent = 0
+        self.throttled = 0
+        self.org_windows = {}
+        self.l3_rules = {}
+        self.port_overrides = {}
+        self.action_batches = {}
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+            self.bytes_sent = 0
+            self.throttled = 0
+
+    def should_throttle(self, org_id):
+        """Per-org sliding one-second window, plus optional random 429s."""
+        if self.args.throttle_probability and random.random() < self.args.throttle_probability:
+            return True
+        if not self.args.throttle_rate:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            window = [t for t in self.org_windows.get(org_id, []) if now - t < 1.0]
+            if len(window) >= self.args.throttle_rate:
+                self.org_windows[org_id] = window
+                return True
+            window.append(now)
+            self.org_windows[org_id] = window
+            return False
+
+    def ports(self, serial):
+        ports = []
+        for n in range(1, PORTS_PER_SWITCH + 1):
+            port = {
+                "portId": str(n),
+                "name": f"Port {n}",
+                "type": "access",
+                "vlan": 10,
+                "voiceVlan": None,
+                "nativeVlan": 1,
+                "allowedVlans": "all",
+            }
+            port.update(self.port_overrides.get((serial, str(n)), {}))
+            ports.append(port)
+        return ports
+
+
+def paginate(items, query, max_per_page=1000):
+    per_page = min(int(query.get("perPage", [max_per_page])[0]), max_per_page)
+    start = int(query.get("startingAfter", ["0"])[0] or 0)
+    page = items[start:start + per_page]
+    next_start = start + per_page if start + per_page < len(items) else None
+    return page, next_start
+
+
+def make_handler(state):
+    org = state.org
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, body, status=200, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+            with state.lock:
+                state.bytes_sent += len(data)
+
+        def send_page(self, items, query, max_per_page=1000):
+            page, next_start = paginate(items, query, max_per_page)
+            headers = {}
+            if next_start is not None:
+                params = {k: v for k, v in query.items() if k != "startingAfter"}
+                params["startingAfter"] = [str(next_start)]
+                url = f"http://{self.headers['Host']}{urlparse(self.path).path}?{urlencode(params, doseq=True)}"
+                headers["Link"] = f"<{url}>; rel=next"
+            self.send_json(page, headers=headers)
+
+        def read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length)) if length else None
+
+        def handle_any(self, method):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            path = url.path
+
+            # Read the body up front so keep-alive connections stay in sync on errors
+            body = self.read_json() if method in ("PUT", "POST") else None
+
+            if path == "/_stats":
+                with state.lock:
+                    stats = {
+                        "requests": sum(state.stats.values()),
+                        "by_route": dict(state.stats),
+                        "throttled": state.throttled,
+                        "bytes": state.bytes_sent,
+                    }
+                return self.send_json(stats)
+            if path == "/_stats/reset":
+                self.send_json({})
+                return state.reset()
+
+            for route_method, pattern, name, handler in ROUTES:
+                match = pattern.match(path)
+                if route_method == method and match:
+                    break
+            else:
+                return self.send_json({"errors": [f"no mock route for {method} {path}"]}, 404)
+
+            with state.lock:
+                state.stats[f"{method} {name}"] += 1
+            if state.should_throttle(org.org_id):
+                with state.lock:
+                    state.throttled += 1
+                return self.send_json({"errors": ["API rate limit exceeded"]}, 429,
+                                      {"Retry-After": str(state.args.retry_after)})
+
+            latency = state.args.endpoint_latency.get(name, state.args.latency)
+            if latency:
+                time.sleep(latency / 1000.0)
+            return handler(self, match, query, body)
+
+        def do_GET(self):
+            self.handle_any("GET")
+
+        def do_PUT(self):
+            self.handle_any("PUT")
+
+        def do_POST(self):
+            self.handle_any("POST")
+
+    def orgs(h, m, q, body):
+        h.send_json([{"id": org.org_id, "name": "Benchmark Org"}])
+
+    def networks(h, m, q, body):
+        h.send_page(org.networks, q, max_per_page=100000)
+
+    def devices(h, m, q, body):
+        found = org.devices
+        if "productTypes[]" in q:
+            found = [d for d in found if d["productType"] in q["productTypes[]"]]
+        if "serials[]" in q:
+            wanted = set(q["serials[]"])
+            found = [d for d in found if d["serial"] in wanted]
+        if "networkIds[]" in q:
+            wanted = set(q["networkIds[]"])
+            found = [d for d in found if d["networkId"] in wanted]
+        if "name" in q:
+            needle = q["name"][0].upper()
+            found = [d for d in found if needle in d["name"].upper()]
+        h.send_page(found, q)
+
+    def uplink_statuses(h, m, q, body):
+        statuses = [{
+            "serial": d["serial"],
+            "networkId": d["networkId"],
+            "uplinks": [
+                {"interface": "wan1", "status": "active", "ipAssignedBy": "static", "ip": "203.0.113.2",
+                 "publicIp": "203.0.113.2", "gateway": "203.0.113.1", "primaryDns": "8.8.8.8", "secondaryDns": "8.8.4.4"},
+                {"interface": "wan2", "status": "ready", "ipAssignedBy": "dhcp", "ip": "198.51.100.7",
+                 "publicIp": "198.51.100.7", "gateway": "198.51.100.1", "primaryDns": "1.1.1.1", "secondaryDns": None},
+            ],
+        } for d in org.by_product("appliance")]
+        h.send_page(statuses, q)
+
+    def uplink_settings(h, m, q, body):
+        h.send_json({"interfaces": {
+            "wan1": {"enabled": True, "vlanTagging": {"enabled": False}, "pppoe": {"enabled": False},
+                     "svis": {"ipv4": {"address": "203.0.113.2/29"}}},
+            "wan2": {"enabled": True, "vlanTagging": {"enabled": True, "vlanId": 20}, "pppoe": {"enabled": False},
+                     "svis": {"ipv4": {"assignmentMode": "dynamic"}}},
+        }})
+
+    def vlans(h, m, q, body):
+        site = int(m["net"].split("_")[1])
+        h.send_json([
+            {"id": vlan, "name": name, "subnet": f"10.{site % 256}.{vlan}.0/24"}
+            for vlan, name in ((10, "Data"), (20, "Voice"), (30, "Guest-Network"))
+        ])
+
+    def policy_objects(h, m, q, body):
+        h.send_json([
+            {"id": "po1", "name": "DNS-Google-1", "category": "network", "type": "cidr", "cidr": "8.8.8.8/32"},
+            {"id": "po2", "name": "DNS-Google-2", "category": "network", "type": "cidr", "cidr": "8.8.4.4/32"},
+            {"id": "po3", "name": "Updates", "category": "network", "type": "fqdn", "fqdn": "updates.example.com"},
+        ])
+
+    def policy_groups(h, m, q, body):
+        h.send_json([{"id": "pg1", "name": "Public-DNS", "objectIds": ["po1", "po2"]}])
+
+    def l3_rules(h, m, q, body):
+        if body is not None:
+            state.l3_rules[m["net"]] = body.get("rules", [])
+        rules = state.l3_rules.get(m["net"], [])
+        h.send_json({"rules": rules + [{
+            "comment": "Default rule", "policy": "allow", "protocol": "Any", "srcPort": "Any",
+            "srcCidr": "Any", "destPort": "Any", "destCidr": "Any", "syslogEnabled": False,
+        }]})
+
+    def switch_ports(h, m, q, body):
+        h.send_json(state.ports(m["serial"]))
+
+    def switch_port(h, m, q, body):
+        state.port_overrides.setdefault((m["serial"], m["port"]), {}).update(body or {})
+        port = next(p for p in state.ports(m["serial"]) if p["portId"] == m["port"])
+        h.send_json(port)
+
+    def ports_by_switch(h, m, q, body):
+        switches = org.by_product("switch")
+        if "serials[]" in q:
+            wanted = set(q["serials[]"])
+            switches = [d for d in switches if d["serial"] in wanted]
+        h.send_page([{"serial": d["serial"], "name": d["name"], "ports": state.ports(d["serial"])} for d in switches],
+                    q, max_per_page=50)
+
+    def create_action_batch(h, m, q, body):
+        for action in body.get("actions", []):
+            parts = action["resource"].strip("/").split("/")
+            state.port_overrides.setdefault((parts[1], parts[-1]), {}).update(action.get("body", {}))
+        batch_id = str(len(state.action_batches) + 1)
+        state.action_batches[batch_id] = {"id": batch_id, "confirmed": True, "synchronous": False,
+                                          "status": {"completed": True, "failed": False, "errors": []}}
+        h.send_json(state.action_batches[batch_id], 201)
+
+    def action_batch(h, m, q, body):
+        h.send_json(state.action_batches.get(m["batch"], {"status": {"failed": True, "errors": ["unknown batch"]}}))
+
+    def clients(h, m, q, body):
+        net_id = m["net"]
+        items = [org.client(net_id, i) for i in range(org.clients_per_network)]
+        # t0 wins over timespan, which defaults to one day, as on the real API
+        if "t0" in q:
+            since = float(q["t0"][0])
+        else:
+            since = time.time() - float(q.get("timespan", [86400])[0])
+        h.send_page([c for c in items if c["lastSeen"] >= since], q)
+
+    routes = [
+        ("GET", r"/organizations$", "orgs", orgs),
+        ("GET", r"/organizations/(?P<org>[^/]+)/networks$", "networks", networks),
+        ("GET", r"/organizations/(?P<org>[^/]+)/devices$", "devices", devices),
+        ("GET", r"/organizations/(?P<org>[^/]+)/appliance/uplink/statuses$", "uplink_statuses", uplink_statuses),
+        ("GET", r"/devices/(?P<serial>[^/]+)/appliance/uplinks/settings$", "uplink_settings", uplink_settings),
+        ("GET", r"/networks/(?P<net>[^/]+)/appliance/vlans$", "vlans", vlans),
+        ("GET", r"/organizations/(?P<org>[^/]+)/policyObjects$", "policy_objects", policy_objects),
+        ("GET", r"/organizations/(?P<org>[^/]+)/policyObjects/groups$", "policy_groups", policy_groups),
+        ("GET", r"/networks/(?P<net>[^/]+)/appliance/firewall/l3FirewallRules$", "l3_rules", l3_rules),
+        ("PUT", r"/networks/(?P<net>[^/]+)/appliance/firewall/l3FirewallRules$", "l3_rules", l3_rules),
+        ("GET", r"/devices/(?P<serial>[^/]+)/switch/ports$", "switch_ports", switch_ports),
+        ("PUT", r"/devices/(?P<serial>[^/]+)/switch/ports/(?P<port>[^/]+)$", "switch_port", switch_port),
+        ("GET", r"/organizations/(?P<org>[^/]+)/switch/ports/bySwitch$", "ports_by_switch", ports_by_switch),
+        ("POST", r"/organizations/(?P<org>[^/]+)/actionBatches$", "action_batches", create_action_batch),
+        ("GET", r"/organizations/(?P<org>[^/]+)/actionBatches/(?P<batch>[^/]+)$", "action_batch", action_batch),
+        ("GET", r"/networks/(?P<net>[^/]+)/clients$", "clients", clients),
+    ]
+    ROUTES = [(method, re.compile(pattern), name, handler) for method, pattern, name, handler in routes]
+    return Handler
+
+
+def parse_endpoint_latency(values):
+    latency = {}
+    for value in values or []:
+        name, _, ms = value.partition("=")
+        latency[name.strip()] = float(ms)
+    return latency
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Local Meraki Dashboard API stand-in for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--size", choices=sorted(SIZES), default="small", help="Synthetic org size: small=10, medium=1k, large=10k devices")
+    parser.add_argument("--devices", type=int, help="Exact device count (overrides --size)")
+    parser.add_argument("--clients-per-network", type=int, default=200, help="Clients returned by each network (default 200)")
+    parser.add_argument("--latency", type=float, default=50, help="Milliseconds added to every response (default 50)")
+    parser.add_argument("--endpoint-latency", action="append", metavar="ROUTE=MS", help="Per-route latency override, e.g. clients=200 (repeatable)")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Per-org requests per second before answering 429 (default off)")
+    parser.add_argument("--throttle-probability", type=float, default=0, help="Probability of a random 429 on any request (default 0)")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429s (default 1)")
+    return parser
+
+
+def serve(args):
+    org = SyntheticOrg(args.devices or SIZES[args.size], args.clients_per_network)
+    args.endpoint_latency = parse_endpoint_latency(args.endpoint_latency)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockState(org, args)))
+    server.daemon_threads = True
+    print(f"🧪 Mock Meraki API on http://{args.host}:{server.server_port} "
+          f"({len(org.devices)} devices, {len(org.networks)} networks)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    serve(build_parser().parse_args())
@@ -0,0 +1,41 @@
+"""Run a script and record its own peak RSS when it exits.
+
+    python rss_wrapper.py <result file> <script> [args...]
+
+A child's ru_maxrss from wait4() (and getrusage(RUSAGE_SELF) after exec) on
+Linux still carries the parent's RSS at fork time, so the harness would
+report its own size. VmHWM in /proc/self/status is reset by exec and only
+covers this process. Platforms without /proc fall back to ru_maxrss, which
+macOS does not carry across exec.
+"""
+import atexit
+import os
+import resource
+import runpy
+import sys
+
+
+def peak_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def record(path):
+    with open(path, "w") as f:
+        f.write(f"{peak_rss_mb():.1f}\n")
+
+
+if __name__ == "__main__":
+    result_path, script = sys.argv[1], sys.argv[2]
+    atexit.register(record, result_path)
+    # Make the script see the same argv and sys.path as `python script.py`
+    sys.argv = sys.argv[2:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    runpy.run_path(script, run_name="__main__")
@@ -0,0 +1,287 @@
+"""Run the four scripts against the local mock Meraki API and record a JSON baseline.
+
+For each org size a mock server is started (see mock_server.py) and every
+script runs in a scratch copy of the repo, so backups and reports never land
+in the working tree. Each run records wall time, API requests served, 429s,
+achieved requests/second and the script's peak RSS.
+
+    python benchmarks/run_benchmarks.py --sizes small,medium
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/baseline-abc1234.json
+
+Peak RSS is recorded inside each script by rss_wrapper.py (VmHWM on Linux,
+ru_maxrss on macOS).
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+from mock_server import SIZES, SyntheticOrg
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+COPY_DIRS = ("meraki_auto", "switchport_configurator", "firewall", "wireless")
+SCRIPTS = ("ports", "fw-push", "wan-report", "wifi-clients", "wifi-clients-incremental")
+RULE_HEADER = ["Rule #", "Device", "Comment", "Policy", "Protocol", "Src Type", "Src Value",
+               "Src Port", "Dst Type", "Dst Value", "Dst Port"]
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_sandbox():
+    sandbox = Path(tempfile.mkdtemp(prefix="meraki-bench-"))
+    for name in COPY_DIRS:
+        shutil.copytree(REPO_ROOT / name, sandbox / name,
+                        ignore=shutil.ignore_patterns("__pycache__", "*.xlsx", "*.csv", "*.json", "*.db"))
+    return sandbox
+
+
+def write_port_sheet(path, org, max_switches):
+    import openpyxl
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.append(["Switch Serial", "Port", "Description", "Type", "VLAN", "Voice VLAN", "Native VLAN", "Allowed VLANs"])
+    for n, switch in enumerate(org.by_product("switch")[:max_switches]):
+        sheet.append([switch["serial"], 1, f"Desk {n}", "access", 20, 30, None, None])
+        sheet.append([switch["serial"], 2, f"Uplink {n}", "trunk", None, None, 1, "1-100"])
+    wb.save(path)
+
+
+def write_rule_sheet(path, org, max_firewalls):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(RULE_HEADER)
+        for mx in org.by_product("appliance")[:max_firewalls]:
+            serial = mx["serial"]
+            writer.writerows([
+                [1, serial, "Guest to DNS", "allow", "udp", "vlan", "Guest-Network", "any", "object", "Public-DNS", "53"],
+                [2, serial, "Block guest to data", "deny", "any", "vlan", "Guest-Network", "any", "vlan", "Data", "any"],
+                [3, serial, "Voice to PBX", "allow", "udp", "vlan", "Voice", "any", "cidr", "172.16.5.10/32", "5060-5061"],
+                [4, serial, "Data to updates", "allow", "tcp", "vlan", "Data", "any", "object", "Updates", "443"],
+                [5, serial, "Block telnet", "deny", "tcp", "any", "", "any", "any", "", "23"],
+            ])
+
+
+def commands(sandbox, org, args):
+    """Command line for each script, writing inputs into the sandbox first."""
+    python = sys.executable
+    write_port_sheet(sandbox / "switchport_configurator" / "port_descriptions.xlsx", org, args.max_switches)
+    rules = sandbox / "bench_rules.csv"
+    write_rule_sheet(rules, org, args.max_firewalls)
+    incremental = [python, "wireless/meraki_wireless_client_exporter/wireless_client_exporter.py",
+                   "--org-id", org.org_id, "--output", str(sandbox / "clients-incremental.csv"),
+                   "--incremental", "--state", str(sandbox / "clients-state.db")]
+    return {
+        "ports": [python, "switchport_configurator/update_meraki_ports.py", "--org-id", org.org_id],
+        "fw-push": [python, "firewall/meraki-mx-rule-deployer/meraki_mx_rule_deployer.py", "--excel-file", str(rules)],
+        "wan-report": [python, "firewall/meraki-mx-wan-reporter/meraki_mx_wan_report.py", "--csv", str(sandbox / "wan.csv")],
+        "wifi-clients": [python, "wireless/meraki_wireless_client_exporter/wireless_client_exporter.py",
+                         "--org-id", org.org_id, "--output", str(sandbox / "clients.csv")],
+        "wifi-clients-incremental": incremental,
+    }
+
+
+def warmups(cmds):
+    """Unmeasured runs that must happen first: the incremental export is timed on its second run."""
+    return {"wifi-clients-incremental": cmds["wifi-clients-incremental"]}
+
+
+def fetch_json(url, method="GET"):
+    with urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=10) as response:
+        return json.loads(response.read())
+
+
+def start_mock(size, args):
+    port = free_port()
+    cmd = [sys.executable, str(BENCH_DIR / "mock_server.py"), "--port", str(port), "--devices", str(SIZES[size]),
+           "--latency", str(args.latency), "--clients-per-network", str(args.clients_per_network),
+           "--throttle-rate", str(args.throttle_rate), "--throttle-probability", str(args.throttle_probability)]
+    server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            fetch_json(f"{base_url}/_stats")
+            return server, base_url
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit(f"❌ Mock server for size '{size}' did not start")
+
+
+def run_script(cmd, cwd, env, log_path, timeout):
+    """Run one script. Returns (exit code, wall seconds, peak RSS in MB or None).
+
+    The script runs under rss_wrapper.py, which reports the child's own peak
+    RSS; wait4()'s ru_maxrss would include the harness's RSS at fork time.
+    """
+    rss_path = Path(cwd) / ".peak_rss"
+    rss_path.unlink(missing_ok=True)
+    cmd = [cmd[0], str(BENCH_DIR / "rss_wrapper.py"), str(rss_path), *cmd[1:]]
+    with open(log_path, "w") as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdin=subprocess.PIPE, stdout=log, stderr=subprocess.STDOUT)
+        # Answers the switchport script's closing "Press Enter" prompt
+        proc.stdin.write(b"\n")
+        proc.stdin.close()
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+        try:
+            _, status = os.waitpid(proc.pid, 0)
+        finally:
+            timer.cancel()
+        wall = time.perf_counter() - started
+    proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    # Missing when the script was killed before its exit handlers ran
+    rss_mb = float(rss_path.read_text()) if rss_path.exists() else None
+    return proc.returncode, wall, rss_mb
+
+
+def run_size(size, scripts, args, log_dir):
+    org = SyntheticOrg(SIZES[size], args.clients_per_network)
+    server, base_url = start_mock(size, args)
+    sandbox = make_sandbox()
+    results = []
+    try:
+        cmds = commands(sandbox, org, args)
+        warmup_cmds = warmups(cmds)
+        env = {**os.environ, "MERAKI_API_BASE_URL": base_url, "MERAKI_DASHBOARD_API_KEY": "benchmark"}
+        for script in scripts:
+            log_path = log_dir / f"{script}-{size}.log"
+            if script in warmup_cmds:
+                print(f"🔥 Warm-up run of {script} on {size} org...", flush=True)
+                env["MERAKI_INVENTORY_DB"] = str(sandbox / f"{script}-warmup-inventory.db")
+                warmup_log = log_dir / f"{script}-{size}-warmup.log"
+                code, _, _ = run_script(warmup_cmds[script], sandbox, env, warmup_log, args.timeout)
+                if code != 0:
+                    print(f"   ⚠️  Warm-up exited {code}, see {warmup_log}")
+            fetch_json(f"{base_url}/_stats/reset", "POST")
+            print(f"▶️  {script} on {size} org ({SIZES[size]} devices)...", flush=True)
+            cmd = cmds[script]
+            profile_path = sandbox / f"{script}-profile.json"
+            if args.profile:
+                cmd = cmd + ["--profile", str(profile_path)]
+            # A fresh inventory per script, so every run starts from a cold cache
+            env["MERAKI_INVENTORY_DB"] = str(sandbox / f"{script}-inventory.db")
+            code, wall, rss_mb = run_script(cmd, sandbox, env, log_path, args.timeout)
+            stats = fetch_json(f"{base_url}/_stats")
+            result = {
+                "script": script,
+                "size": size,
+                "devices": SIZES[size],
+                "exit_code": code,
+                "wall_s": round(wall, 3),
+                "requests": stats["requests"],
+                "throttled": stats["throttled"],
+                "req_per_s": round(stats["requests"] / wall, 2) if wall else None,
+                "bytes": stats["bytes"],
+                "peak_rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+                "by_route": stats["by_route"],
+            }
+            if args.profile and profile_path.exists():
+                with open(profile_path) as f:
+                    result["profile"] = json.load(f)
+            results.append(result)
+            status = "✅" if code == 0 else f"❌ exit {code}, see {log_path}"
+            rss = f"{rss_mb:.1f} MB" if rss_mb is not None else "n/a"
+            print(f"   {status} {wall:.2f}s, {stats['requests']} requests ({result['req_per_s']} req/s), "
+                  f"{stats['throttled']} 429s, peak RSS {rss}")
+    finally:
+        server.kill()
+        server.wait()
+        shutil.rmtree(sandbox, ignore_errors=True)
+    return results
+
+
+def compare(baseline_path, results):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {(r["script"], r["size"]): r for r in baseline["results"]}
+    print(f"\n📈 Compared with {baseline_path} (revision {baseline.get('revision')}):")
+    matched = [(old[(r["script"], r["size"])], r) for r in results if (r["script"], r["size"]) in old]
+    if not matched:
+        print("   No script/size runs in common.")
+        return
+    print(f"   {'script':<13}{'size':<8}{'metric':<13}{'before':>10}{'after':>10}{'change':>9}")
+    for before, result in matched:
+        for metric in ("wall_s", "requests", "req_per_s", "peak_rss_mb"):
+            a, b = before.get(metric), result.get(metric)
+            if a is None or b is None:
+                continue
+            change = f"{(b - a) / a * 100:+.1f}%" if a else "n/a"
+            print(f"   {result['script']:<13}{result['size']:<8}{metric:<13}{a:>10}{b:>10}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scripts against a local mock Meraki API.")
+    parser.add_argument("--sizes", default="small,medium", help=f"Comma-separated org sizes: {', '.join(SIZES)} (default small,medium)")
+    parser.add_argument("--scripts", default=",".join(SCRIPTS), help=f"Comma-separated scripts (default {','.join(SCRIPTS)})")
+    parser.add_argument("--latency", type=float, default=50, help="Mock API latency per response in ms (default 50)")
+    parser.add_argument("--clients-per-network", type=int, default=200, help="Clients per network for wifi-clients (default 200)")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Mock per-org requests/second before 429s (default off)")
+    parser.add_argument("--throttle-probability", type=float, default=0, help="Probability of a random 429 (default 0)")
+    parser.add_argument("--max-switches", type=int, default=200, help="Switches in the generated port sheet (default 200)")
+    parser.add_argument("--max-firewalls", type=int, default=50, help="MX devices in the generated rule sheet (default 50)")
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds before a script run is killed (default 1800)")
+    parser.add_argument("--profile", action="store_true", help="Run each script with --profile and keep its report in the baseline")
+    parser.add_argument("--output", help="Baseline JSON path (default benchmarks/results/baseline-<revision>.json)")
+    parser.add_argument("--compare", help="Earlier baseline JSON to compare against")
+    args = parser.parse_args()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    scripts = [s.strip() for s in args.scripts.split(",") if s.strip()]
+    for name, allowed in ((sizes, SIZES), (scripts, SCRIPTS)):
+        unknown = [n for n in name if n not in allowed]
+        if unknown:
+            parser.error(f"unknown value(s): {', '.join(unknown)}")
+
+    revision = git_revision()
+    output = Path(args.output) if args.output else BENCH_DIR / "results" / f"baseline-{revision}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    log_dir = output.parent / "logs"
+    log_dir.mkdir(exist_ok=True)
+
+    results = []
+    for size in sizes:
+        results.extend(run_size(size, scripts, args, log_dir))
+
+    baseline = {
+        "revision": revision,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"\n💾 Baseline saved to: {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure `meraki-auto <command> --help` start-up time against a per-command budget.
+
+Each command runs several times in a fresh interpreter with -X importtime.
+The median wall time is checked against BUDGETS_MS, and the import log is
+checked for heavy modules that no command should need before it has parsed
+its arguments. Exits 1 when a budget is missed, so it can gate CI.
+
+    python benchmarks/startup_budget.py
+    python benchmarks/startup_budget.py --runs 10 --output startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Median milliseconds for `meraki-auto [command] --help`: interpreter start plus
+# every import the command needs before argument parsing. "" is the bare CLI.
+BUDGETS_MS = {
+    "": 100,
+    "ports": 300,
+    "fw-push": 300,
+    "wan-report": 350,
+    "wifi-clients": 300,
+}
+# Only imported once a command has real work for them
+HEAVY_MODULES = ("pandas", "meraki", "pyarrow", "openpyxl", "numpy")
+
+
+def measure(command, runs):
+    """Returns (median ms, slowest top-level imports, heavy modules imported)."""
+    cmd = [sys.executable, "-X", "importtime", "-m", "meraki_auto", *([command] if command else []), "--help"]
+    walls = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+        walls.append((time.perf_counter() - started) * 1000)
+        if proc.returncode != 0:
+            raise SystemExit(f"❌ {' '.join(cmd[3:])} failed:\n{proc.stderr}")
+
+    # importtime lines: "import time: self [us] | cumulative | module", nesting shown by indentation
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  "):
+            imports[name.strip()] = int(cumulative) / 1000
+        imports.setdefault(name.strip().split(".")[0], 0.0)
+    slowest = sorted(((ms, name) for name, ms in imports.items() if ms), reverse=True)[:3]
+    heavy = sorted(name for name in imports if name in HEAVY_MODULES)
+    return statistics.median(walls), slowest, heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check meraki-auto start-up time against its budget.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command; the median is used (default 5)")
+    parser.add_argument("--output", help="Also write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for command, budget in BUDGETS_MS.items():
+        median_ms, slowest, heavy = measure(command, args.runs)
+        ok = median_ms <= budget and not heavy
+        failed |= not ok
+        label = f"meraki-auto {command}".strip()
+        top = ", ".join(f"{name} {ms:.0f}ms" for ms, name in slowest)
+        print(f"{'✅' if ok else '❌'} {label:<26} {median_ms:6.0f} ms (budget {budget} ms)  slowest imports: {top}")
+        if heavy:
+            print(f"   ⚠️  imports {', '.join(heavy)} before parsing arguments")
+        results.append({"command": label, "median_ms": round(median_ms, 1), "budget_ms": budget,
+                        "slowest_imports": {name: round(ms, 1) for ms, name in slowest}, "heavy_imports": heavy})
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": sys.version.split()[0], "runs": args.runs, "results": results}, f, indent=2)
+        print(f"\n💾 Saved to: {args.output}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
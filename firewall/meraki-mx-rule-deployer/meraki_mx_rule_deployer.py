@@ -1,256 +1,511 @@
-# Same imports as before
-import argparse, os, json, pandas as pd, meraki, requests
-from collections import defaultdict
-from pathlib import Path
-from datetime import datetime
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import pprint
-
-parser = argparse.ArgumentParser(description='Push Meraki firewall rules from Excel.')
-parser.add_argument('--api-key', help='Meraki API Key (or use MERAKI_DASHBOARD_API_KEY)')
-parser.add_argument('--excel-file', default='meraki_mx_rules.xlsx')
-parser.add_argument('--dry-run', action='store_true')
-parser.add_argument('--max-threads', type=int, default=5)
-args = parser.parse_args()
-
-start_time = time.time()
-API_KEY = args.api_key or os.getenv("MERAKI_DASHBOARD_API_KEY")
-if not API_KEY:
-    raise ValueError("API key is required.")
-
-SCRIPT_DIR = Path(__file__).resolve().parent
-EXCEL_PATH = SCRIPT_DIR / args.excel_file
-if not EXCEL_PATH.exists():
-    raise FileNotFoundError(f"Excel file '{EXCEL_PATH.name}' not found in: {SCRIPT_DIR}")
-
-print(f"Using Excel file: {EXCEL_PATH.name}")
-dashboard = meraki.DashboardAPI(API_KEY, suppress_logging=True)
-df = pd.read_excel(EXCEL_PATH)
-
-device_rule_map = defaultdict(list)
-for _, row in df.iterrows():
-    device_ref = str(row['Device']).strip()
-    device_rule_map[device_ref].append(row)
-
-def get_all_devices_by_org():
-    orgs = dashboard.organizations.getOrganizations()
-    all_devs = []
-    for org in orgs:
-        try:
-            devs = dashboard.organizations.getOrganizationDevices(org['id'])
-            for d in devs:
-                d['orgId'] = org['id']
-            all_devs.extend(devs)
-        except:
-            continue
-    return all_devs
-
-def get_device_info_map():
-    device_map = {}
-    for d in get_all_devices_by_org():
-        if d['model'].startswith('MX'):
-            if 'serial' in d:
-                device_map[d['serial'].upper()] = d
-            if d.get('name'):
-                device_map[d['name'].strip().upper()] = d
-    return device_map
-
-def is_dual_mx(network_id):
-    try:
-        devs = dashboard.networks.getNetworkDevices(network_id)
-        return len([d for d in devs if d['model'].startswith('MX')]) > 1
-    except:
-        return False
-
-def get_vlan_objects(network_id):
-    try:
-        vlans = dashboard.appliance.getNetworkApplianceVlans(network_id)
-        return {v['name']: v['subnet'] for v in vlans}
-    except:
-        return {}
-
-def get_object_value_map(api_key, org_id):
-    headers = {
-        "X-Cisco-Meraki-API-Key": api_key,
-        "Content-Type": "application/json",
-        "Accept": "application/json"
-    }
-    base_url = f"https://api.meraki.com/api/v1/organizations/{org_id}"
-    object_values = {}
-    object_lookup = {}
-
-    try:
-        obj_resp = requests.get(f"{base_url}/policyObjects", headers=headers)
-        objects = obj_resp.json() if obj_resp.ok else []
-
-        for obj in objects:
-            if obj.get("cidr"):
-                object_values[obj['name']] = obj["cidr"]
-                object_lookup[obj['name']] = "cidr"
-            elif obj.get("fqdn"):
-                object_values[obj['name']] = obj["fqdn"]
-                object_lookup[obj['name']] = "fqdn"
-
-        group_resp = requests.get(f"{base_url}/policyObjects/groups", headers=headers)
-        groups = group_resp.json() if group_resp.ok else []
-
-        obj_map = {o['id']: o for o in objects}
-
-        for group in groups:
-            cidrs, fqdns = [], []
-            for obj_id in group.get("objectIds", []):
-                obj = obj_map.get(obj_id)
-                if not obj:
-                    continue
-                if obj.get("cidr"):
-                    cidrs.append(obj["cidr"])
-                elif obj.get("fqdn"):
-                    fqdns.append(obj["fqdn"])
-            if cidrs and fqdns:
-                print(f"  ⚠️ Skipping mixed group '{group['name']}'")
-                continue
-            if cidrs:
-                object_values[group['name']] = cidrs
-                object_lookup[group['name']] = "cidr"
-            elif fqdns:
-                object_values[group['name']] = fqdns
-                object_lookup[group['name']] = "fqdn"
-
-    except Exception as e:
-        print(f"❌ Failed fetching policy objects/groups: {e}")
-    return object_values, object_lookup
-
-def expand_rule(row, vlan_map, use_vlan_objects, object_values, object_lookup):
-    rules = []
-    base = {
-        "comment": row["Comment"],
-        "policy": str(row["Policy"]).lower(),
-        "protocol": str(row["Protocol"]).lower(),
-        "srcPort": str(row["Src Port"]),
-        "destPort": str(row["Dst Port"])
-    }
-
-    src_type = str(row["Src Type"]).lower()
-    src_val = str(row["Src Value"]).strip() if pd.notna(row["Src Value"]) else ""
-    dst_type = str(row["Dst Type"]).lower()
-    dst_val = str(row["Dst Value"]).strip() if pd.notna(row["Dst Value"]) else ""
-
-    src_cidrs = []
-    dst_targets = []
-
-    # Source logic
-    if src_type == "vlan" and use_vlan_objects:
-        src_cidrs = [vlan_map.get(src_val, "any")]
-    elif src_type == "cidr":
-        src_cidrs = [src_val]
-    elif src_type == "object":
-        if src_val not in object_values or object_lookup[src_val] != "cidr":
-            print(f"  ❌ Invalid or FQDN source object: {src_val}")
-            return [{"invalid": True, **base}]
-        val = object_values[src_val]
-        src_cidrs = val if isinstance(val, list) else [val]
-    elif src_type == "any":
-        src_cidrs = ["any"]
-    else:
-        src_cidrs = [src_val]
-
-    # Dest logic
-    if dst_type == "vlan" and use_vlan_objects:
-        dst_targets = [{"destCidr": vlan_map.get(dst_val, "any")}]
-    elif dst_type == "cidr":
-        dst_targets = [{"destCidr": dst_val}]
-    elif dst_type == "object":
-        if dst_val not in object_values:
-            print(f"  ❌ Invalid destination object: {dst_val}")
-            return [{"invalid": True, **base}]
-        val = object_values[dst_val]
-        if object_lookup[dst_val] == "cidr":
-            items = val if isinstance(val, list) else [val]
-            dst_targets = [{"destCidr": cidr} for cidr in items]
-        elif object_lookup[dst_val] == "fqdn":
-            items = val if isinstance(val, list) else [val]
-            dst_targets = [{"destFqdn": fqdn, "destCidr": "any"} for fqdn in items]
-    elif dst_type == "fqdn":
-        dst_targets = [{"destFqdn": dst_val, "destCidr": "any"}]
-    elif dst_type == "any":
-        dst_targets = [{"destCidr": "any"}]
-
-    # Build expanded rule set
-    for src in src_cidrs:
-        for dst in dst_targets:
-            rule = base.copy()
-            rule["srcCidr"] = src
-            rule.update(dst)
-            rules.append(rule)
-
-    return rules
-
-def compare_rules(old, new):
-    print("\n🔍 DRY RUN COMPARISON:")
-    norm = lambda r: json.dumps(r, sort_keys=True)
-    old_set = set(map(norm, old))
-    new_set = set(map(norm, new))
-
-    for r in new_set - old_set:
-        print("\n🟢 NEW RULE:\n", pprint.pformat(json.loads(r)))
-    for r in old_set - new_set:
-        print("\n🔴 REMOVED RULE:\n", pprint.pformat(json.loads(r)))
-
-def process_firewall(device_ref, ruleset, dashboard, device_map, script_dir, dry_run, api_key):
-    ref = device_ref.upper()
-    if ref not in device_map:
-        return f"[!] Device '{device_ref}' not found."
-
-    device = device_map[ref]
-    net_id = device["networkId"]
-    org_id = device["orgId"]
-    name = device.get("name", device["serial"])
-    dual = is_dual_mx(net_id)
-    vlans = get_vlan_objects(net_id) if not dual else {}
-    use_vlans = not dual
-    object_values, object_lookup = get_object_value_map(api_key, org_id)
-
-    print(f"\n[+] Processing {name} (Dual MX: {dual})")
-    rules = []
-    invalid = False
-
-    if isinstance(ruleset, list) and ruleset and 'Rule #' in ruleset[0]:
-        ruleset.sort(key=lambda r: r['Rule #'])
-
-    for row in ruleset:
-        expanded = expand_rule(row, vlans, use_vlans, object_values, object_lookup)
-        for rule in expanded:
-            if rule.get("invalid"):
-                print("\n❌ INVALID RULE:\n", pprint.pformat(rule))
-                invalid = True
-            else:
-                print("\n✅ VALID RULE:\n", pprint.pformat(rule))
-            rules.append(rule)
-
-    if invalid:
-        return "[!] Skipped due to invalid rules."
-
-    existing = dashboard.appliance.getNetworkApplianceFirewallL3FirewallRules(net_id)
-    backup = existing.get("rules", [])
-    if dry_run:
-        compare_rules(backup, rules)
-        return f"[✓] Dry run complete for {name}"
-    else:
-        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        bkp = script_dir / f"{name}_mx_backup_{ts}.json"
-        with open(bkp, "w") as f:
-            json.dump(backup, f, indent=2)
-        dashboard.appliance.updateNetworkApplianceFirewallL3FirewallRules(net_id, rules=rules)
-        return f"[✓] Pushed {len(rules)} rules to {name}"
-
-# === THREAD EXECUTION ===
-device_map = get_device_info_map()
-with ThreadPoolExecutor(max_workers=args.max_threads) as executor:
-    futures = [executor.submit(
-        process_firewall, ref, ruleset, dashboard, device_map, SCRIPT_DIR, args.dry_run, API_KEY
-    ) for ref, ruleset in device_rule_map.items()]
-    for f in as_completed(futures):
-        print(f.result())
-
-print(f"\n🕒 Script finished in {time.time() - start_time:.2f} seconds.")
+# Same imports as before
+import argparse, os, re, sys, json
+from collections import defaultdict, Counter
+from pathlib import Path
+from datetime import datetime
+import time
+from concurrent.futures import as_completed
+import pprint
+import hashlib
+import difflib
+import ipaddress
+
+# Make the shared meraki_auto package importable when run as a plain script
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from meraki_auto.cache import RunCache
+from meraki_auto.client import MerakiClient
+from meraki_auto.concurrency import AdaptiveLimiter, ContextExecutor
+from meraki_auto.inventory import Inventory
+from meraki_auto.metrics import Metrics, format_summary
+from rule_analysis import analyze_rules, format_report
+from rule_loader import iter_rule_rows
+from rule_optimizer import optimize_rules
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Push Meraki firewall rules from Excel.')
+    parser.add_argument('--api-key', help='Meraki API Key (or use MERAKI_DASHBOARD_API_KEY)')
+    parser.add_argument('--excel-file', default='meraki_mx_rules.xlsx', help='Rule sheet (.xlsx or .csv)')
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument('--max-threads', type=int, default=5, help='Worker threads; upper limit on requests in flight with --adaptive')
+    parser.add_argument('--adaptive', action='store_true', help='Adapt requests in flight to latency and 429s (AIMD)')
+    parser.add_argument('--device-index', help='JSON file caching serial/name -> (orgId, networkId) between runs')
+    parser.add_argument('--optimize', action='store_true', help='Merge expanded rules into compact multi-CIDR rules before pushing')
+    parser.add_argument('--analyze', action='store_true', help='Report shadowed, redundant and conflicting rules before pushing')
+    parser.add_argument('--verbose', action='store_true', help='Print every expanded rule')
+    parser.add_argument('--refresh', action='store_true', help='Re-read orgs and devices from the API instead of the local inventory or --device-index')
+    parser.add_argument('--profile', nargs='?', const='fw_push_profile.json', metavar='PATH', help='Write per-endpoint API timings as JSON (default fw_push_profile.json)')
+    return parser.parse_args(argv)
+
+SERIAL_PATTERN = re.compile(r'^[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}$')
+NAME_FILTER_LIMIT = 10  # Above this many name lookups, one appliance inventory pull per org is cheaper
+FILTER_CHUNK = 100  # Serials/network IDs per filtered request, keeping URLs well under front-end limits
+# Only what stays true while a device sits in its network; HA status (mxCount) is recounted every run
+INDEX_FIELDS = ('serial', 'name', 'networkId', 'orgId')
+
+def index_entry(device):
+    return {k: device.get(k) for k in INDEX_FIELDS}
+
+def load_device_index(path):
+    try:
+        with open(path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Older index files stored whole device records, mxCount included
+    return {ref: index_entry(d) for ref, d in index.items()
+            if isinstance(d, dict) and d.get('serial') and d.get('networkId') and d.get('orgId')}
+
+def save_device_index(path, index):
+    with open(path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+def find_devices_in_org(dashboard, org_id, refs):
+    """Look up the referenced MX devices in one org, letting the API filter where it can.
+
+    `refs` are the sheet's own spellings: names go to the API filter unchanged.
+    """
+    path = f"/organizations/{org_id}/devices"
+    base = {'productTypes[]': 'appliance', 'perPage': 1000}
+    serials = [r.upper() for r in refs if SERIAL_PATTERN.match(r.upper())]
+    names = [r for r in refs if not SERIAL_PATTERN.match(r.upper())]
+
+    found = []
+    if len(names) > NAME_FILTER_LIMIT:
+        # Too many names to filter one by one; the appliance inventory covers serials too
+        found = dashboard.get_all(path, org_id=org_id, params=base)
+    else:
+        for i in range(0, len(serials), FILTER_CHUNK):
+            found += dashboard.get_all(path, org_id=org_id, params={**base, 'serials[]': serials[i:i + FILTER_CHUNK]})
+        for name in names:
+            # The name filter also matches substrings; exact matching happens in the caller
+            found += dashboard.get_all(path, org_id=org_id, params={**base, 'name': name})
+
+    for d in found:
+        d['orgId'] = org_id
+    return [d for d in found if is_mx(d)]
+
+def count_mx_per_network(dashboard, org_id, network_ids):
+    network_ids = sorted(network_ids)
+    counts = Counter()
+    for i in range(0, len(network_ids), FILTER_CHUNK):
+        devs = dashboard.get_all(
+            f"/organizations/{org_id}/devices",
+            org_id=org_id,
+            params={'productTypes[]': 'appliance', 'networkIds[]': network_ids[i:i + FILTER_CHUNK], 'perPage': 1000},
+        )
+        counts.update(d['networkId'] for d in devs if is_mx(d))
+    return counts
+
+def is_mx(d):
+    return (d.get('model') or '').startswith('MX') and d.get('networkId')
+
+def get_device_info_map(dashboard, inventory, device_refs, max_threads, index_path=None, refresh=False):
+    """Resolve only the devices named in the sheet.
+
+    Refs already in the persisted index or fresh in the shared inventory are
+    used as-is. The rest are looked up in every org in parallel, and lookups
+    stop as soon as each ref is found. The MX count per network is worked out
+    again on every run, index hits included.
+    """
+    # Keys are matched without regard to case; lookups send the sheet's spelling
+    spelled = {ref.strip().upper(): ref.strip() for ref in device_refs}
+    refs = set(spelled)
+    # --refresh bypasses both device caches; the index is rewritten from what is found
+    index = load_device_index(index_path) if index_path and not refresh else {}
+    device_map = {ref: dict(index[ref]) for ref in refs if ref in index}
+    pending = refs - set(device_map)
+
+    if pending:
+        for key, d in inventory.find_devices(sorted(pending)).items():
+            if is_mx(d):
+                d['orgId'] = d['organizationId']
+                device_map[key] = d
+                pending.discard(key)
+
+    if pending:
+        print(f"🔍 Resolving {len(pending)} device reference(s) across organizations...")
+        orgs = inventory.orgs()
+        with ContextExecutor(max_workers=max_threads) as executor:
+            futures = {executor.submit(find_devices_in_org, dashboard, org['id'], [spelled[k] for k in sorted(pending)]): org['id'] for org in orgs}
+            for future in as_completed(futures):
+                try:
+                    devs = future.result()
+                except Exception as e:
+                    print(f"⚠️  Device lookup failed in org {futures[future]}: {e}")
+                    continue
+                inventory.add_devices(futures[future], devs)
+                for d in devs:
+                    for key in (d['serial'].upper(), (d.get('name') or '').strip().upper()):
+                        if key in pending:
+                            device_map[key] = d
+                            pending.discard(key)
+                if not pending:
+                    for other in futures:
+                        other.cancel()
+                    break
+
+    if device_map:
+        # HA detection: from the inventory when the org's device list is fresh,
+        # otherwise one filtered call per org covering every network in the map
+        networks_by_org = defaultdict(set)
+        for d in device_map.values():
+            networks_by_org[d['orgId']].add(d['networkId'])
+        for org_id, network_ids in networks_by_org.items():
+            try:
+                if inventory.devices_fresh(org_id):
+                    counts = Counter(d['networkId'] for d in inventory.devices_in_networks(network_ids, 'appliance') if is_mx(d))
+                else:
+                    counts = count_mx_per_network(dashboard, org_id, network_ids)
+            except Exception as e:
+                # Unknown, not single-MX: VLAN objects must not be used on a possible HA pair
+                print(f"⚠️  Could not count MX appliances per network in org {org_id}: {e}")
+                counts = None
+            for d in device_map.values():
+                if d['orgId'] == org_id:
+                    d['mxCount'] = counts.get(d['networkId'], 1) if counts is not None else None
+
+    if index_path and device_map:
+        index.update({ref: index_entry(d) for ref, d in device_map.items()})
+        save_device_index(index_path, index)
+
+    return device_map
+
+def is_dual_mx(device):
+    # Worked out during device resolution; no extra API call per device
+    return device.get('mxCount', 1) > 1
+
+def get_vlan_objects(dashboard, network_id, org_id=None):
+    try:
+        vlans = dashboard.get(f"/networks/{network_id}/appliance/vlans", org_id=org_id)
+        return {v['name']: v['subnet'] for v in vlans}
+    except:
+        return {}
+
+def get_object_value_map(dashboard, org_id):
+    base_path = f"/organizations/{org_id}"
+    object_values = {}
+    object_lookup = {}
+
+    try:
+        obj_resp = dashboard.request("GET", f"{base_path}/policyObjects", org_id=org_id)
+        objects = obj_resp.json() if obj_resp.ok else []
+
+        for obj in objects:
+            if obj.get("cidr"):
+                object_values[obj['name']] = obj["cidr"]
+                object_lookup[obj['name']] = "cidr"
+            elif obj.get("fqdn"):
+                object_values[obj['name']] = obj["fqdn"]
+                object_lookup[obj['name']] = "fqdn"
+
+        group_resp = dashboard.request("GET", f"{base_path}/policyObjects/groups", org_id=org_id)
+        groups = group_resp.json() if group_resp.ok else []
+
+        obj_map = {o['id']: o for o in objects}
+
+        for group in groups:
+            cidrs, fqdns = [], []
+            for obj_id in group.get("objectIds", []):
+                obj = obj_map.get(obj_id)
+                if not obj:
+                    continue
+                if obj.get("cidr"):
+                    cidrs.append(obj["cidr"])
+                elif obj.get("fqdn"):
+                    fqdns.append(obj["fqdn"])
+            if cidrs and fqdns:
+                print(f"  ⚠️ Skipping mixed group '{group['name']}'")
+                continue
+            if cidrs:
+                object_values[group['name']] = cidrs
+                object_lookup[group['name']] = "cidr"
+            elif fqdns:
+                object_values[group['name']] = fqdns
+                object_lookup[group['name']] = "fqdn"
+
+    except Exception as e:
+        print(f"❌ Failed fetching policy objects/groups: {e}")
+    return object_values, object_lookup
+
+def expand_rule(row, vlan_map, use_vlan_objects, object_values, object_lookup):
+    rules = []
+    base = {
+        "comment": row.comment,
+        "policy": row.policy,
+        "protocol": row.protocol,
+        "srcPort": row.src_port,
+        "destPort": row.dst_port
+    }
+
+    src_type = row.src_type
+    src_val = row.src_value
+    dst_type = row.dst_type
+    dst_val = row.dst_value
+
+    src_cidrs = []
+    dst_targets = []
+
+    # Source logic
+    if src_type == "vlan" and use_vlan_objects:
+        src_cidrs = [vlan_map.get(src_val, "any")]
+    elif src_type == "cidr":
+        src_cidrs = [src_val]
+    elif src_type == "object":
+        if src_val not in object_values or object_lookup[src_val] != "cidr":
+            print(f"  ❌ Invalid or FQDN source object: {src_val}")
+            return [{"invalid": True, **base}]
+        val = object_values[src_val]
+        src_cidrs = val if isinstance(val, list) else [val]
+    elif src_type == "any":
+        src_cidrs = ["any"]
+    else:
+        src_cidrs = [src_val]
+
+    # Dest logic
+    if dst_type == "vlan" and use_vlan_objects:
+        dst_targets = [{"destCidr": vlan_map.get(dst_val, "any")}]
+    elif dst_type == "cidr":
+        dst_targets = [{"destCidr": dst_val}]
+    elif dst_type == "object":
+        if dst_val not in object_values:
+            print(f"  ❌ Invalid destination object: {dst_val}")
+            return [{"invalid": True, **base}]
+        val = object_values[dst_val]
+        if object_lookup[dst_val] == "cidr":
+            items = val if isinstance(val, list) else [val]
+            dst_targets = [{"destCidr": cidr} for cidr in items]
+        elif object_lookup[dst_val] == "fqdn":
+            items = val if isinstance(val, list) else [val]
+            dst_targets = [{"destFqdn": fqdn, "destCidr": "any"} for fqdn in items]
+    elif dst_type == "fqdn":
+        dst_targets = [{"destFqdn": dst_val, "destCidr": "any"}]
+    elif dst_type == "any":
+        dst_targets = [{"destCidr": "any"}]
+
+    # Build expanded rule set
+    for src in src_cidrs:
+        for dst in dst_targets:
+            rule = base.copy()
+            rule["srcCidr"] = src
+            rule.update(dst)
+            rules.append(rule)
+
+    return rules
+
+def canonical_target(part):
+    # Bare host addresses and their /32 form are the same target
+    try:
+        return str(ipaddress.ip_network(part, strict=False))
+    except ValueError:
+        return part
+
+def canonical_targets(value):
+    # Comma-separated CIDR/FQDN lists are order-insensitive inside one rule
+    parts = [p.strip().lower() for p in str(value if value is not None else "any").split(",")]
+    return ",".join(sorted(canonical_target(p) for p in parts if p)) or "any"
+
+def canonical_ports(value):
+    text = str(value if value is not None else "any").strip().lower()
+    if text in ("", "nan", "none"):
+        return "any"
+    # Excel hands numeric ports back as floats (53.0)
+    return ",".join(p.strip()[:-2] if p.strip().endswith(".0") else p.strip() for p in text.split(","))
+
+def canonical_rule(rule):
+    """Comparable form of an L3 rule, whether built by expand_rule or read back from the API."""
+    comment = rule.get("comment")
+    return (
+        str(rule.get("policy", "")).strip().lower(),
+        str(rule.get("protocol", "")).strip().lower(),
+        canonical_targets(rule.get("srcCidr")),
+        canonical_ports(rule.get("srcPort")),
+        canonical_targets(rule.get("destFqdn") or rule.get("destCidr")),
+        canonical_ports(rule.get("destPort")),
+        "" if comment is None or str(comment) == "nan" else str(comment).strip(),
+        bool(rule.get("syslogEnabled", False)),
+    )
+
+def strip_default_rule(rules):
+    # The API always returns Meraki's implicit allow-any rule last; it is never sent
+    if rules and str(rules[-1].get("comment", "")).strip().lower() == "default rule":
+        return rules[:-1]
+    return rules
+
+def rules_match(live, desired):
+    """Order-aware check that the live ruleset already equals the desired one."""
+    return [canonical_rule(r) for r in strip_default_rule(live)] == [canonical_rule(r) for r in desired]
+
+def compare_rules(old, new):
+    print("\n🔍 DRY RUN COMPARISON:")
+    old = strip_default_rule(old)
+    matcher = difflib.SequenceMatcher(
+        None, [canonical_rule(r) for r in old], [canonical_rule(r) for r in new], autojunk=False
+    )
+    changes = [op for op in matcher.get_opcodes() if op[0] != "equal"]
+    if not changes:
+        print("   No changes.")
+    # Order-aware: a moved rule shows up as removed at its old position and new at its new one
+    for tag, i1, i2, j1, j2 in changes:
+        for idx in range(i1, i2):
+            print(f"\n🔴 REMOVED RULE (was #{idx + 1}):\n", pprint.pformat(old[idx]))
+        for idx in range(j1, j2):
+            print(f"\n🟢 NEW RULE (#{idx + 1}):\n", pprint.pformat(new[idx]))
+
+def row_key(row):
+    # Rule content only; the sheet line and device don't change the compiled rules
+    return row._replace(line=None, device=None)
+
+def object_map_version(run_cache, org_id, object_values):
+    """Content fingerprint of an org's object map, so orgs with identical objects share compiled rules."""
+    return run_cache.get(
+        ("objects-version", org_id),
+        lambda: hashlib.sha1(json.dumps(object_values, sort_keys=True).encode()).hexdigest()
+    )
+
+def compile_ruleset(args, run_cache, ruleset, vlans, use_vlans, org_id, object_values, object_lookup):
+    """Expand and validate a ruleset once per (rows, object map, VLAN map).
+
+    Returns (rules, invalid, cached). The rule list is shared between devices
+    and must not be modified by callers.
+    """
+    key = (
+        "compiled",
+        tuple(row_key(row) for row in ruleset),
+        object_map_version(run_cache, org_id, object_values),
+        use_vlans,
+        tuple(sorted(vlans.items())),
+    )
+    compiled_here = []
+
+    def compile_rows():
+        compiled_here.append(True)
+        rules = []
+        invalid = False
+        for row in ruleset:
+            for rule in expand_rule(row, vlans, use_vlans, object_values, object_lookup):
+                if rule.get("invalid"):
+                    print("\n❌ INVALID RULE:\n", pprint.pformat(rule))
+                    invalid = True
+                elif args.verbose:
+                    print("\n✅ VALID RULE:\n", pprint.pformat(rule))
+                rules.append(rule)
+        if args.optimize and not invalid:
+            before = len(rules)
+            rules = optimize_rules(rules)
+            print(f"    🧮 Optimized {before} expanded rules into {len(rules)}")
+        return rules, invalid
+
+    rules, invalid = run_cache.get(key, compile_rows)
+    return rules, invalid, not compiled_here
+
+def process_firewall(args, run_cache, device_ref, ruleset, dashboard, device_map, backup_dir):
+    ref = device_ref.upper()
+    if ref not in device_map:
+        return f"[!] Device '{device_ref}' not found."
+
+    device = device_map[ref]
+    net_id = device["networkId"]
+    org_id = device["orgId"]
+    name = device.get("name", device["serial"])
+    if device.get('mxCount', 1) is None:
+        return f"[!] Skipped {device.get('name', device['serial'])}: could not tell whether its network has an HA MX pair."
+    dual = is_dual_mx(device)
+    vlans = run_cache.get(("vlans", net_id), lambda: get_vlan_objects(dashboard, net_id, org_id)) if not dual else {}
+    use_vlans = not dual
+    object_values, object_lookup = run_cache.get(("objects", org_id), lambda: get_object_value_map(dashboard, org_id))
+
+    print(f"\n[+] Processing {name} (Dual MX: {dual})")
+    rules, invalid, cached = compile_ruleset(args, run_cache, ruleset, vlans, use_vlans, org_id, object_values, object_lookup)
+    print(f"    {name}: {len(rules)} rules{' (reused compiled ruleset)' if cached else ''}")
+
+    if invalid:
+        return "[!] Skipped due to invalid rules."
+
+    # Compiled rule lists are shared through run_cache, so their identity keys the analysis too
+    report = run_cache.get(("analysis", id(rules)), lambda: analyze_rules(rules)) if args.analyze else None
+
+    rules_path = f"/networks/{net_id}/appliance/firewall/l3FirewallRules"
+    existing = dashboard.get(rules_path, org_id=org_id)
+    backup = existing.get("rules", [])
+    if report:
+        print(format_report(report))
+    if args.dry_run:
+        compare_rules(backup, rules)
+        return f"[✓] Dry run complete for {name}"
+    elif rules_match(backup, rules):
+        # Nothing to do: no backup, no write, no config-change event
+        return f"[=] {name} already has the desired {len(rules)} rules; skipped push"
+    else:
+        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        bkp = backup_dir / f"{name}_mx_backup_{ts}.json"
+        with open(bkp, "w") as f:
+            json.dump(backup, f, indent=2)
+        dashboard.put(rules_path, org_id=org_id, json={"rules": rules})
+        return f"[✓] Pushed {len(rules)} rules to {name}"
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    start_time = time.time()
+    api_key = args.api_key or os.getenv("MERAKI_DASHBOARD_API_KEY")
+    if not api_key:
+        raise ValueError("API key is required.")
+
+    # A relative sheet path is looked up in the current directory first, then next to the script
+    script_dir = Path(__file__).resolve().parent
+    excel_path = Path(args.excel_file)
+    if not excel_path.is_absolute() and not excel_path.exists():
+        excel_path = script_dir / args.excel_file
+    if not excel_path.exists():
+        raise FileNotFoundError(f"Excel file '{excel_path.name}' not found in: {Path.cwd()} or {script_dir}")
+
+    print(f"Using Excel file: {excel_path.name}")
+    metrics = Metrics()
+    dashboard = MerakiClient(
+        api_key,
+        limiter=AdaptiveLimiter(args.max_threads) if args.adaptive else None,
+        metrics=metrics if args.profile else None,
+    )
+    # Orgs and devices persisted between runs and shared with the other scripts
+    inventory = Inventory(dashboard, refresh=args.refresh)
+    # Per-run memo of org policy objects and network VLANs, shared by all worker threads
+    run_cache = RunCache()
+
+    # Stream typed rows from the sheet; every row is validated once, here
+    load_errors = []
+    device_rule_map = defaultdict(list)
+    for row in iter_rule_rows(excel_path, load_errors):
+        device_rule_map[row.device].append(row)
+
+    if load_errors:
+        for error in load_errors:
+            print(f"❌ {excel_path.name} {error}")
+        raise SystemExit(f"[!] {len(load_errors)} invalid row(s) in {excel_path.name}; nothing was pushed.")
+
+    # Order each device's rows once up front, so identical sheets compile to the same cache key
+    for ruleset in device_rule_map.values():
+        ruleset.sort(key=lambda r: (r.rule_no is None, r.rule_no or 0))
+
+    # === THREAD EXECUTION ===
+    with metrics.phase("discovery"):
+        device_map = get_device_info_map(dashboard, inventory, device_rule_map, args.max_threads,
+                                         args.device_index, args.refresh)
+    with metrics.phase("push"), ContextExecutor(max_workers=args.max_threads) as executor:
+        # Backups are written next to the sheet
+        futures = [executor.submit(
+            process_firewall, args, run_cache, ref, ruleset, dashboard, device_map, excel_path.resolve().parent
+        ) for ref, ruleset in device_rule_map.items()]
+        for f in as_completed(futures):
+            if args.adaptive:
+                print(f"{f.result()} (concurrency {dashboard.concurrency}/{args.max_threads})")
+            else:
+                print(f.result())
+
+    print(f"\n🕒 Script finished in {time.time() - start_time:.2f} seconds.")
+    if args.profile:
+        print(f"\n{format_summary(metrics.write(args.profile))}")
+        print(f"📝 Profile saved to: {args.profile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import ipaddress
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+# Shadowed / redundant / conflicting rule analysis for expanded L3 rulesets.
+#
+# Comparing every pair of rules is quadratic, so candidate pairs come from
+# integer-range indexes instead:
+#   - CIDRs are indexed by (version, network start, prefix length). The rules
+#     whose CIDR contains a given prefix are found by looking up its at most
+#     33 (or 129) supernets, and the rules inside it by bisecting the sorted
+#     network starts between its bounds.
+#   - Port ranges are split into aligned power-of-two blocks, like prefixes.
+#     The ranges containing a port are found by looking up its 17 enclosing
+#     blocks, and the ranges starting inside a query by bisecting the sorted
+#     range starts.
+# Candidates are then confirmed with an exact containment/overlap check.
+
+ANY_NETWORKS = (ipaddress.ip_network("0.0.0.0/0"), ipaddress.ip_network("::/0"))
+ALL_PORTS = [(0, 65535)]
+
+
+def parse_targets(value):
+    """Comma-separated CIDRs/IPs -> (networks, fqdns). Returns None if a value isn't an address."""
+    networks, fqdns = [], []
+    for part in str(value if value is not None else "any").split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part == "any":
+            networks.extend(ANY_NETWORKS)
+            continue
+        try:
+            networks.append(ipaddress.ip_network(part, strict=False))
+        except ValueError:
+            return None
+    return networks, fqdns
+
+
+def parse_ports(value):
+    ranges = []
+    for part in str(value if value is not None else "any").split(","):
+        part = part.strip().lower()
+        if part.endswith(".0"):
+            part = part[:-2]
+        if part in ("", "any", "nan"):
+            return ALL_PORTS
+        lo, _, hi = part.partition("-")
+        try:
+            ranges.append((int(lo), int(hi or lo)))
+        except ValueError:
+            return None
+    return ranges
+
+
+class ParsedRule:
+    __slots__ = ("index", "rule", "policy", "protocol", "srcs", "dsts", "fqdns", "sports", "dports")
+
+    def __init__(self, index, rule):
+        self.index = index
+        self.rule = rule
+        self.policy = str(rule.get("policy", "")).lower()
+        self.protocol = str(rule.get("protocol", "any")).lower()
+        src = parse_targets(rule.get("srcCidr"))
+        if rule.get("destFqdn"):
+            dst = ([], [str(rule["destFqdn"]).strip().lower()])
+        else:
+            dst = parse_targets(rule.get("destCidr"))
+        self.sports = parse_ports(rule.get("srcPort"))
+        self.dports = parse_ports(rule.get("destPort"))
+        if src is None or dst is None or self.sports is None or self.dports is None:
+            raise ValueError("unparseable rule")
+        self.srcs = src[0]
+        self.dsts, self.fqdns = dst
+
+
+def _net_key(net):
+    return net.version, int(net.network_address), net.prefixlen
+
+
+def _nets_within(inner, outer):
+    return all(any(n.version == o.version and n.subnet_of(o) for o in outer) for n in inner)
+
+
+def _nets_overlap(a, b):
+    return any(x.version == y.version and x.overlaps(y) for x in a for y in b)
+
+
+def _ports_within(inner, outer):
+    return all(any(olo <= lo and hi <= ohi for olo, ohi in outer) for lo, hi in inner)
+
+
+def _ports_overlap(a, b):
+    return any(lo <= ohi and olo <= hi for lo, hi in a for olo, ohi in b)
+
+
+def _protocol_within(inner, outer):
+    return outer.protocol == "any" or outer.protocol == inner.protocol
+
+
+def contains(outer, inner):
+    """True if every packet matched by `inner` is also matched by `outer`."""
+    if not _protocol_within(inner, outer):
+        return False
+    if not _nets_within(inner.srcs, outer.srcs):
+        return False
+    if not _nets_within(inner.dsts, outer.dsts):
+        return False
+    outer_any_dst = all(n in outer.dsts for n in ANY_NETWORKS)
+    if inner.fqdns and not outer_any_dst and not set(inner.fqdns) <= set(outer.fqdns):
+        return False
+    return _ports_within(inner.sports, outer.sports) and _ports_within(inner.dports, outer.dports)
+
+
+def overlaps(a, b):
+    if not (a.protocol == "any" or b.protocol == "any" or a.protocol == b.protocol):
+        return False
+    if not _nets_overlap(a.srcs, b.srcs):
+        return False
+    dst_overlap = _nets_overlap(a.dsts, b.dsts) or bool(set(a.fqdns) & set(b.fqdns))
+    # An FQDN destination overlaps an "any" destination
+    dst_overlap = dst_overlap or (a.fqdns and any(n.prefixlen == 0 for n in b.dsts)) \
+        or (b.fqdns and any(n.prefixlen == 0 for n in a.dsts))
+    if not dst_overlap:
+        return False
+    return _ports_overlap(a.sports, b.sports) and _ports_overlap(a.dports, b.dports)
+
+
+class PrefixIndex:
+    """Rules indexed by the CIDR prefixes of one field (source or destination)."""
+
+    def __init__(self):
+        self.by_prefix = defaultdict(set)
+        self.starts = {4: [], 6: []}  # sorted (start, prefixlen, rule index)
+
+    def add(self, networks, rule_index):
+        for net in networks:
+            key = _net_key(net)
+            self.by_prefix[key].add(rule_index)
+            entries = self.starts[net.version]
+            entries.insert(bisect_left(entries, (key[1], key[2], rule_index)), (key[1], key[2], rule_index))
+
+    def containing(self, net):
+        found = set()
+        version, start, prefixlen = _net_key(net)
+        bits = net.max_prefixlen
+        for length in range(prefixlen + 1):
+            # Supernet start by integer masking; cheaper than ip_network.supernet()
+            ids = self.by_prefix.get((version, start >> (bits - length) << (bits - length), length))
+            if ids:
+                found |= ids
+        return found
+
+    def overlapping(self, net):
+        found = self.containing(net)
+        entries = self.starts[net.version]
+        lo, hi = int(net.network_address), int(net.broadcast_address)
+        # Prefixes are nested or disjoint, so those starting inside `net` lie inside it
+        for _, _, rule_index in entries[bisect_left(entries, (lo,)):bisect_right(entries, (hi, 129, float("inf")))]:
+            found.add(rule_index)
+        return found
+
+
+PORT_BITS = 16
+
+
+def _port_blocks(lo, hi):
+    """Split [lo, hi] into aligned blocks, as (size bits, block number) keys."""
+    hi += 1
+    while lo < hi:
+        bits = (lo & -lo).bit_length() - 1 if lo else PORT_BITS
+        while lo + (1 << bits) > hi:
+            bits -= 1
+        yield bits, lo >> bits
+        lo += 1 << bits
+
+
+class PortIndex:
+    """Rules indexed by destination port range, as aligned blocks plus sorted range starts."""
+
+    def __init__(self):
+        self.by_block = defaultdict(set)
+        self.starts = []  # sorted (low, rule index)
+
+    def add(self, ranges, rule_index):
+        for lo, hi in ranges:
+            for block in _port_blocks(lo, hi):
+                self.by_block[block].add((lo, hi, rule_index))
+            self.starts.insert(bisect_left(self.starts, (lo, rule_index)), (lo, rule_index))
+
+    def stabbing(self, port):
+        """(low, high, rule index) for every indexed range containing `port`."""
+        for bits in range(PORT_BITS + 1):
+            yield from self.by_block.get((bits, port >> bits), ())
+
+    def containing(self, ranges):
+        found = None
+        for lo, hi in ranges:
+            # One range must hold all of [lo, hi]: it contains lo and reaches hi
+            ids = {i for _, ohi, i in self.stabbing(lo) if hi <= ohi}
+            found = ids if found is None else found & ids
+        return found or set()
+
+    def overlapping(self, ranges):
+        found = set()
+        for lo, hi in ranges:
+            # Ranges overlapping [lo, hi] either contain lo or start inside it
+            found.update(i for _, _, i in self.stabbing(lo))
+            found.update(i for _, i in self.starts[bisect_right(self.starts, (lo, float("inf"))):
+                                                    bisect_right(self.starts, (hi, float("inf")))])
+        return found
+
+
+class RuleIndex:
+    def __init__(self):
+        self.src = PrefixIndex()
+        self.dst = PrefixIndex()
+        self.fqdn = defaultdict(set)
+        self.ports = PortIndex()
+
+    def add(self, parsed):
+        self.src.add(parsed.srcs, parsed.index)
+        self.dst.add(parsed.dsts, parsed.index)
+        for fqdn in parsed.fqdns:
+            self.fqdn[fqdn].add(parsed.index)
+        self.ports.add(parsed.dports, parsed.index)
+
+    def containing(self, parsed):
+        """Candidate rules that may contain `parsed` (superset of the true answer)."""
+        candidates = set.intersection(*(self.src.containing(n) for n in parsed.srcs)) if parsed.srcs else set()
+        if parsed.dsts:
+            candidates &= set.intersection(*(self.dst.containing(n) for n in parsed.dsts))
+        for fqdn in parsed.fqdns:
+            any_dst = self.dst.containing(ANY_NETWORKS[0]) & self.dst.containing(ANY_NETWORKS[1])
+            candidates &= self.fqdn.get(fqdn, set()) | any_dst
+        return candidates & self.ports.containing(parsed.dports)
+
+    def overlapping(self, parsed):
+        candidates = set().union(*(self.src.overlapping(n) for n in parsed.srcs))
+        dst_candidates = set().union(*(self.dst.overlapping(n) for n in parsed.dsts))
+        for fqdn in parsed.fqdns:
+            dst_candidates |= self.fqdn.get(fqdn, set())
+            dst_candidates |= self.dst.containing(ANY_NETWORKS[0]) | self.dst.containing(ANY_NETWORKS[1])
+        if parsed.dsts:
+            dst_candidates |= {i for ids in self.fqdn.values() for i in ids} \
+                if any(n.prefixlen == 0 for n in parsed.dsts) else set()
+        return candidates & dst_candidates & self.ports.overlapping(parsed.dports)
+
+
+def _entry(parsed, other=None):
+    entry = {"rule": parsed.index + 1, "comment": parsed.rule.get("comment"), "policy": parsed.policy}
+    if other is not None:
+        entry.update({"by": other.index + 1, "by_comment": other.rule.get("comment"), "by_policy": other.policy})
+    return entry
+
+
+def analyze_rules(rules):
+    """Analyse an expanded ruleset in order. Rule numbers in the report are 1-based.
+
+    Returns a dict with:
+      shadowed  - rules fully covered by an earlier rule, so they never match
+      redundant - rules covered by a later rule with the same policy and no
+                  conflicting rule in between, so removing them changes nothing
+      conflicts - rules partly overlapping an earlier rule with a different policy
+      skipped   - rules that could not be parsed (e.g. unresolved names)
+    """
+    parsed_rules, skipped = [], []
+    for index, rule in enumerate(rules):
+        try:
+            parsed_rules.append(ParsedRule(index, rule))
+        except ValueError:
+            skipped.append({"rule": index + 1, "comment": rule.get("comment")})
+    by_index = {p.index: p for p in parsed_rules}
+
+    report = {"total": len(rules), "shadowed": [], "redundant": [], "conflicts": [], "skipped": skipped}
+
+    # Forward pass: compare each rule with the rules before it
+    earlier = RuleIndex()
+    shadowed = set()
+    for parsed in parsed_rules:
+        # Only the first covering rule is reported, so stop confirming at it
+        covering = next((i for i in sorted(earlier.containing(parsed)) if contains(by_index[i], parsed)), None)
+        if covering is not None:
+            shadowed.add(parsed.index)
+            report["shadowed"].append(_entry(parsed, by_index[covering]))
+        else:
+            for i in sorted(earlier.overlapping(parsed)):
+                other = by_index[i]
+                if other.policy != parsed.policy and overlaps(other, parsed):
+                    report["conflicts"].append(_entry(parsed, other))
+                    break
+        earlier.add(parsed)
+
+    # Backward pass: look for a later, broader rule with the same policy
+    full = RuleIndex()
+    for parsed in parsed_rules:
+        full.add(parsed)
+    later = RuleIndex()
+    for parsed in reversed(parsed_rules):
+        if parsed.index not in shadowed:
+            j = next((j for j in sorted(later.containing(parsed))
+                      if by_index[j].policy == parsed.policy and contains(by_index[j], parsed)), None)
+            # Only the nearest broader rule needs checking: a conflicting rule
+            # before it also sits before every broader rule further down
+            if j is not None:
+                overlap = sorted(full.overlapping(parsed))
+                between = overlap[bisect_right(overlap, parsed.index):bisect_left(overlap, j)]
+                if not any(by_index[k].policy != parsed.policy and overlaps(by_index[k], parsed) for k in between):
+                    report["redundant"].append(_entry(parsed, by_index[j]))
+        later.add(parsed)
+    report["redundant"].sort(key=lambda e: e["rule"])
+    return report
+
+
+def format_report(report):
+    lines = [f"\n🔬 RULE ANALYSIS ({report['total']} rules):"]
+    for entry in report["shadowed"]:
+        lines.append(f"   🌑 Rule {entry['rule']} ({entry['comment']}) is shadowed by rule {entry['by']} ({entry['by_comment']}, {entry['by_policy']})")
+    for entry in report["redundant"]:
+        lines.append(f"   ♻️  Rule {entry['rule']} ({entry['comment']}) is redundant with later rule {entry['by']} ({entry['by_comment']})")
+    for entry in report["conflicts"]:
+        lines.append(f"   ⚔️  Rule {entry['rule']} ({entry['comment']}, {entry['policy']}) partly overlaps rule {entry['by']} ({entry['by_comment']}, {entry['by_policy']})")
+    for entry in report["skipped"]:
+        lines.append(f"   ❔ Rule {entry['rule']} ({entry['comment']}) could not be analysed")
+    if len(lines) == 1:
+        lines.append("   No shadowed, redundant or conflicting rules.")
+    return "\n".join(lines)
@@ -0,0 +1,153 @@
+import csv
+import ipaddress
+import re
+from collections import namedtuple
+from pathlib import Path
+
+# One sheet row, validated and normalized once at load time.
+# `line` is the sheet/CSV row number, used in error messages.
+RuleRow = namedtuple("RuleRow", [
+    "line", "rule_no", "device", "comment", "policy", "protocol",
+    "src_type", "src_value", "src_port", "dst_type", "dst_value", "dst_port",
+])
+
+HEADER_FIELDS = {
+    "rule #": "rule_no",
+    "device": "device",
+    "device name": "device",
+    "comment": "comment",
+    "policy": "policy",
+    "protocol": "protocol",
+    "src type": "src_type",
+    "src value": "src_value",
+    "src port": "src_port",
+    "dst type": "dst_type",
+    "dst value": "dst_value",
+    "dst port": "dst_port",
+}
+REQUIRED_FIELDS = ("device", "policy", "protocol", "src_type", "dst_type")
+
+POLICIES = {"allow", "deny"}
+PROTOCOLS = {"tcp", "udp", "icmp", "icmp6", "any"}
+TARGET_TYPES = {"cidr", "vlan", "fqdn", "object", "any"}
+PORT_PATTERN = re.compile(r"^\d+(-\d+)?(,\d+(-\d+)?)*$")
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _port(value, field):
+    text = _text(value).replace(" ", "").lower()
+    if text in ("", "any"):
+        return "any"
+    if not PORT_PATTERN.match(text):
+        raise ValueError(f"{field} '{value}' is not 'any', a port, a range or a comma-separated list")
+    return text
+
+
+def _cidrs(value, field):
+    for part in value.split(","):
+        try:
+            ipaddress.ip_network(part.strip(), strict=False)
+        except ValueError:
+            raise ValueError(f"{field} '{value}' is not a valid CIDR/IP")
+    return value
+
+
+def build_row(line, fields):
+    """Validate one raw row (field name -> cell value) into a RuleRow. Raises ValueError."""
+    missing = [f for f in REQUIRED_FIELDS if not _text(fields.get(f))]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+
+    policy = _text(fields["policy"]).lower()
+    if policy not in POLICIES:
+        raise ValueError(f"policy '{fields['policy']}' must be allow or deny")
+    protocol = _text(fields["protocol"]).lower()
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"protocol '{fields['protocol']}' must be one of {', '.join(sorted(PROTOCOLS))}")
+
+    targets = {}
+    for side in ("src", "dst"):
+        kind = _text(fields[f"{side}_type"]).lower()
+        if kind not in TARGET_TYPES:
+            raise ValueError(f"{side} type '{fields[f'{side}_type']}' must be one of {', '.join(sorted(TARGET_TYPES))}")
+        value = _text(fields.get(f"{side}_value"))
+        if kind in ("cidr", "vlan", "fqdn", "object") and not value:
+            raise ValueError(f"{side} value is required for type '{kind}'")
+        if kind == "cidr":
+            _cidrs(value, f"{side} value")
+        targets[side] = (kind, value)
+
+    rule_no = fields.get("rule_no")
+    if _text(rule_no):
+        try:
+            rule_no = int(float(rule_no))
+        except (TypeError, ValueError):
+            raise ValueError(f"Rule # '{rule_no}' is not a number")
+    else:
+        rule_no = None
+
+    return RuleRow(
+        line=line,
+        rule_no=rule_no,
+        device=_text(fields["device"]),
+        comment=_text(fields.get("comment")),
+        policy=policy,
+        protocol=protocol,
+        src_type=targets["src"][0],
+        src_value=targets["src"][1],
+        src_port=_port(fields.get("src_port"), "src port"),
+        dst_type=targets["dst"][0],
+        dst_value=targets["dst"][1],
+        dst_port=_port(fields.get("dst_port"), "dst port"),
+    )
+
+
+def _raw_rows(path):
+    """Yield (line number, header-keyed cells) from an .xlsx (read-only, streamed) or .csv file."""
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            for cells in reader:
+                yield reader.line_num, header, cells
+        return
+
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        for line, cells in enumerate(rows, start=2):
+            yield line, header, cells
+    finally:
+        wb.close()
+
+
+def iter_rule_rows(path, errors):
+    """Stream validated RuleRow records from an .xlsx or .csv rule sheet.
+
+    Blank rows are skipped. Invalid rows are skipped and described in
+    `errors` as "row N: reason", so the caller can stop before pushing.
+    """
+    path = Path(path)
+    columns = None
+    for line, header, cells in _raw_rows(path):
+        if columns is None:
+            columns = [HEADER_FIELDS.get(_text(h).lower()) for h in header]
+            if "device" not in columns:
+                errors.append("header: no 'Device' or 'Device Name' column")
+                return
+        if not any(_text(c) for c in cells):
+            continue
+        fields = {name: cell for name, cell in zip(columns, cells) if name}
+        try:
+            yield build_row(line, fields)
+        except ValueError as e:
+            errors.append(f"row {line}: {e}")
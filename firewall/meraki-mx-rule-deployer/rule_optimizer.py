@@ -0,0 +1,95 @@
+import ipaddress
+from collections import OrderedDict
+
+# Fields that must be identical for two expanded rules to share one L3 rule.
+# destFqdn is included because Meraki takes a single FQDN per rule.
+MERGE_FIELDS = ("policy", "protocol", "srcPort", "destPort", "comment", "syslogEnabled", "destFqdn")
+
+
+def merge_key(rule):
+    return tuple(rule.get(field) for field in MERGE_FIELDS)
+
+
+def aggregate_cidrs(values):
+    """Collapse a list of CIDRs/IPs into the fewest prefixes, keeping non-IP values as-is.
+
+    "any" absorbs everything else.
+    """
+    if any(str(v).strip().lower() == "any" for v in values):
+        return ["any"]
+
+    networks, others = {4: [], 6: []}, []
+    for value in values:
+        try:
+            net = ipaddress.ip_network(str(value).strip(), strict=False)
+        except ValueError:
+            if value not in others:
+                others.append(value)
+            continue
+        networks[net.version].append(net)
+
+    collapsed = []
+    for version in (4, 6):
+        for net in ipaddress.collapse_addresses(networks[version]):
+            collapsed.append(str(net.network_address) if net.num_addresses == 1 else str(net))
+    return collapsed + others
+
+
+def merge_run(run):
+    """Merge a run of adjacent rules that share a merge key.
+
+    Within such a run every rule has the same action, so the run matches the
+    union of its (src, dst) pairs regardless of order. Pairs are grouped by
+    source, then sources with the same destination set share one rule.
+    """
+    dests_by_src = OrderedDict()
+    for rule in run:
+        dests = dests_by_src.setdefault(rule.get("srcCidr", "any"), [])
+        dest = rule.get("destCidr", "any")
+        if dest not in dests:
+            dests.append(dest)
+
+    srcs_by_dests = OrderedDict()
+    for src, dests in dests_by_src.items():
+        srcs_by_dests.setdefault(frozenset(dests), (dests, []))[1].append(src)
+
+    merged = []
+    for dests, srcs in srcs_by_dests.values():
+        rule = dict(run[0])
+        rule["srcCidr"] = ",".join(aggregate_cidrs(srcs))
+        rule["destCidr"] = ",".join(aggregate_cidrs(dests))
+        merged.append(rule)
+    return merged
+
+
+def optimize_rules(rules):
+    """Compact an expanded ruleset without changing first-match behaviour.
+
+    - Adjacent rules with the same policy, protocol, ports and comment are
+      merged into comma-separated srcCidr/destCidr lists, which undoes the
+      cartesian expansion of object groups.
+    - Adjacent prefixes inside each list are aggregated.
+    - A rule identical to an earlier one can never match, so it is dropped.
+
+    Only adjacent rules are merged, so no rule moves past a rule with a
+    different action.
+    """
+    merged = []
+    run = []
+    for rule in rules:
+        if run and merge_key(rule) != merge_key(run[0]):
+            merged.extend(merge_run(run))
+            run = []
+        run.append(rule)
+    if run:
+        merged.extend(merge_run(run))
+
+    seen = set()
+    optimized = []
+    for rule in merged:
+        identity = tuple(sorted((k, str(v)) for k, v in rule.items()))
+        if identity in seen:
+            continue
+        seen.add(identity)
+        optimized.append(rule)
+    return optimized
@@ -1,66 +1,61 @@
 import argparse
+import asyncio
 import os
 import sys
-import requests
 import ipaddress
 import csv
+import json
 import time
-import random
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-BASE_URL = "https://api.meraki.com/api/v1"
-
-def request_api(endpoint, api_key, retries=5, backoff_factor=1.5):
-    url = f"{BASE_URL}{endpoint}"
-    headers = {"Authorization": f"Bearer {api_key}", "Accept": "application/json"}
-    for attempt in range(retries):
-        response = requests.get(url, headers=headers)
-        if response.status_code == 429:
-            wait = backoff_factor * (2 ** attempt) + random.uniform(0, 1)
-            print(f"⏳ Rate limit hit. Retrying in {wait:.1f}s...")
-            time.sleep(wait)
-            continue
-        response.raise_for_status()
-        return response.json()
-    raise Exception(f"Too many 429 responses. Giving up on {endpoint}")
-
-def get_all_orgs(api_key):
+
+# Make the shared meraki_auto package importable when run as a plain script
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from meraki_auto.client import MerakiClient
+from meraki_auto.concurrency import AdaptiveLimiter, ContextExecutor
+from meraki_auto.inventory import Inventory
+from meraki_auto.metrics import Metrics, format_summary
+
+def get_all_orgs(inventory):
     print("🔍 Fetching accessible organizations...")
-    return request_api("/organizations", api_key)
+    return inventory.orgs()
 
-def get_devices_in_org(api_key, org_id):
-    print(f"   ↳ Fetching networks and MX/vMX devices for org {org_id}...")
-    devices = []
-    nets = request_api(f"/organizations/{org_id}/networks", api_key)
-    for net in nets:
-        try:
-            serials = request_api(f"/networks/{net['id']}/devices", api_key)
-            for dev in serials:
-                if dev.get("model", "").startswith(("MX", "vMX")):
-                    dev["networkId"] = net["id"]
-                    devices.append(dev)
-        except:
-            continue
-    return devices
-
-def get_device_uplinks_config(api_key, serial):
-    return request_api(f"/devices/{serial}/appliance/uplinks/settings", api_key)
-
-def get_org_uplinks_status(api_key, org_id):
-    return request_api(f"/organizations/{org_id}/appliance/uplink/statuses", api_key)
-
-def get_network_name(api_key, network_id):
+def get_devices_in_org(inventory, org_id):
+    tqdm.write(f"   ↳ Fetching MX/vMX devices for org {org_id}...")
+    # Served from the local inventory; the org-wide device list is only re-pulled when stale
+    return [
+        dev
+        for dev in inventory.devices(org_id, product_types=["appliance"])
+        if (dev.get("model") or "").startswith(("MX", "vMX")) and dev.get("networkId")
+    ]
+
+def get_device_uplinks_config(client, serial, org_id=None):
+    return client.get(f"/devices/{serial}/appliance/uplinks/settings", org_id=org_id)
+
+def get_org_uplinks_status(client, org_id):
+    """Fetch every appliance uplink status in the org, indexed by serial."""
+    statuses = client.get_all(
+        f"/organizations/{org_id}/appliance/uplink/statuses",
+        org_id=org_id,
+        params={"perPage": 1000},
+    )
+    return {status["serial"]: status for status in statuses}
+
+def get_network_names(inventory, org_id):
+    """Map networkId -> name for the whole org from the inventory (one paginated call when stale)."""
     try:
-        info = request_api(f"/networks/{network_id}", api_key)
-        return info.get("name", "Unknown")
-    except:
-        return "Unknown"
+        nets = inventory.networks(org_id)
+    except Exception as e:
+        tqdm.write(f"   ⚠️  Could not fetch network names for org {org_id}: {e}")
+        return {}
+    return {net["id"]: net.get("name", "Unknown") for net in nets}
 
-def parse_and_collect(api_key, dev, uplink_config, status_list):
+def parse_and_collect(dev, uplink_config, status_by_serial, network_names):
     serial = dev["serial"]
-    network_name = get_network_name(api_key, dev["networkId"])
-    matching = next((o for o in status_list if o["serial"] == serial), {})
+    network_name = network_names.get(dev["networkId"], "Unknown")
+    matching = status_by_serial.get(serial, {})
     live_map = {u["interface"]: u for u in matching.get("uplinks", [])}
     rows = []
 
@@ -96,34 +91,103 @@ def parse_and_collect(api_key, dev, uplink_config, status_list):
         })
     return rows
 
-def main(api_key, csv_path, max_threads):
-    start_time = time.time()
-    all_rows = []
-    orgs = get_all_orgs(api_key)
-
-    for org in orgs:
-        org_id = org["id"]
-        devices = get_devices_in_org(api_key, org_id)
-        if not devices:
-            print(f"   ↳ No MX/vMX devices found in org {org_id}.")
-            continue
-
-        print(f"   ↳ Found {len(devices)} MX/vMX devices in org {org_id}.")
-        status_list = get_org_uplinks_status(api_key, org_id)
-
-        with ThreadPoolExecutor(max_workers=max_threads) as executor:
-            futures = {
-                executor.submit(get_device_uplinks_config, api_key, dev["serial"]): dev
-                for dev in devices
-            }
-            for future in tqdm(as_completed(futures), total=len(futures), desc=f"Processing org {org_id}", unit="device"):
-                dev = futures[future]
+async def collect_org(client, inventory, org, executor, slots, max_threads, overall, adaptive):
+    """Collect WAN rows for one org. Orgs run concurrently; each keeps its own
+    per-org rate budget in the shared client and at most `max_threads` device
+    requests in flight."""
+    loop = asyncio.get_running_loop()
+    org_id = org["id"]
+
+    def run(fn, *fn_args):
+        return loop.run_in_executor(executor, fn, *fn_args)
+
+    devices = await run(get_devices_in_org, inventory, org_id)
+    if not devices:
+        tqdm.write(f"   ↳ No MX/vMX devices found in org {org_id}.")
+        return []
+
+    tqdm.write(f"   ↳ Found {len(devices)} MX/vMX devices in org {org_id}.")
+    overall.total += len(devices)
+    overall.refresh()
+    status_by_serial, network_names = await asyncio.gather(
+        run(get_org_uplinks_status, client, org_id),
+        run(get_network_names, inventory, org_id),
+    )
+
+    device_slots = asyncio.Semaphore(max_threads)
+
+    async def fetch_config(dev):
+        async with device_slots:
+            try:
+                return dev, await run(get_device_uplinks_config, client, dev["serial"], org_id), None
+            except Exception as e:
+                return dev, None, e
+
+    rows = []
+    position = slots.pop()
+    progress = tqdm(total=len(devices), desc=f"Processing org {org_id}", unit="device", position=position, leave=False)
+    try:
+        for next_done in asyncio.as_completed([fetch_config(dev) for dev in devices]):
+            dev, uplink_config, error = await next_done
+            progress.update(1)
+            overall.update(1)
+            if adaptive:
+                overall.set_postfix(concurrency=client.concurrency, refresh=False)
+            if error:
+                tqdm.write(f"⚠️  Error with device {dev['serial']}: {error}")
+                continue
+            try:
+                rows.extend(parse_and_collect({**dev, "organizationId": org_id}, uplink_config, status_by_serial, network_names))
+            except Exception as e:
+                tqdm.write(f"⚠️  Error with device {dev['serial']}: {e}")
+    finally:
+        progress.close()
+        slots.append(position)
+    return rows
+
+async def collect_all_orgs(client, inventory, orgs, max_threads, org_concurrency, adaptive):
+    """Walk every org at once, sharing one thread pool and connection pool."""
+    org_slots = asyncio.Semaphore(org_concurrency)
+    # tqdm positions for the per-org bars; position 0 is the combined bar
+    slots = list(range(org_concurrency, 0, -1))
+    overall = tqdm(total=0, desc="All orgs", unit="device", position=0)
+
+    with ContextExecutor(max_workers=max_threads * org_concurrency) as executor:
+        async def bounded(org):
+            async with org_slots:
                 try:
-                    uplink_config = future.result()
-                    rows = parse_and_collect(api_key, {**dev, "organizationId": org_id}, uplink_config, status_list)
-                    all_rows.extend(rows)
+                    return await collect_org(client, inventory, org, executor, slots, max_threads, overall, adaptive)
                 except Exception as e:
-                    tqdm.write(f"⚠️  Error with device {dev['serial']}: {e}")
+                    tqdm.write(f"⚠️  Error with org {org['id']}: {e}")
+                    return []
+
+        # gather keeps org order, so the CSV stays grouped by org
+        results = await asyncio.gather(*(bounded(org) for org in orgs))
+
+    overall.close()
+    return [row for org_rows in results for row in org_rows]
+
+def write_profile(metrics, path):
+    print(f"\n{format_summary(metrics.write(path))}")
+    print(f"📝 Profile saved to: {path}")
+
+def main(api_key, csv_path, max_threads, adaptive=False, org_concurrency=10, profile=None, refresh=False):
+    start_time = time.time()
+    # One limiter spans every org processed at once, so its ceiling is the total worker count
+    workers = max_threads * org_concurrency
+    metrics = Metrics()
+    client = MerakiClient(
+        api_key,
+        pool_size=workers,
+        limiter=AdaptiveLimiter(workers) if adaptive else None,
+        metrics=metrics if profile else None,
+    )
+    inventory = Inventory(client, refresh=refresh)
+    with metrics.phase("discovery"):
+        orgs = get_all_orgs(inventory)
+
+    with metrics.phase("collect"):
+        all_rows = asyncio.run(collect_all_orgs(client, inventory, orgs, max_threads, org_concurrency, adaptive))
 
     if all_rows:
         with open(csv_path, "w", newline="") as f:
@@ -136,21 +200,167 @@ def main(api_key, csv_path, max_threads):
 
     elapsed = time.time() - start_time
     print(f"⏱️  Total elapsed time: {elapsed:.2f} seconds")
+    if profile:
+        write_profile(metrics, profile)
 
-if __name__ == "__main__":
+# Fields whose change is reported in --watch mode
+WATCH_FIELDS = ("Status", "Public IP", "LAN IP", "Gateway IP", "IP Assigned By")
+
+def load_org_configs(client, inventory, org_id, max_threads, previous=None):
+    """Load the slow-changing side of an org: devices, network names and uplink config.
+
+    A device whose config cannot be re-read keeps the one from `previous`, so a
+    transient error is not reported as the uplink disappearing.
+    """
+    devices = get_devices_in_org(inventory, org_id)
+    if not devices:
+        return {"devices": [], "network_names": {}, "configs": {}, "loaded_at": time.monotonic()}
+    network_names = get_network_names(inventory, org_id)
+    old_configs = previous["configs"] if previous else {}
+    configs = {}
+    with ContextExecutor(max_workers=max_threads) as executor:
+        futures = {
+            dev["serial"]: executor.submit(get_device_uplinks_config, client, dev["serial"], org_id)
+            for dev in devices
+        }
+        for serial, future in futures.items():
+            try:
+                configs[serial] = future.result()
+            except Exception as e:
+                tqdm.write(f"⚠️  Error with device {serial}: {e}")
+                if serial in old_configs:
+                    configs[serial] = old_configs[serial]
+    return {
+        "devices": [{**dev, "organizationId": org_id} for dev in devices if dev["serial"] in configs],
+        "network_names": network_names,
+        "configs": configs,
+        "loaded_at": time.monotonic(),
+    }
+
+def poll_org(client, org_id, state):
+    """One org-level status call, joined against the cached config. Returns rows keyed by (serial, interface)."""
+    status_by_serial = get_org_uplinks_status(client, org_id)
+    rows = {}
+    for dev in state["devices"]:
+        for row in parse_and_collect(dev, state["configs"][dev["serial"]], status_by_serial, state["network_names"]):
+            rows[(row["Serial"], row["Interface"])] = row
+    return rows
+
+def watch(api_key, max_threads, interval, config_refresh, output, profile=None, refresh=False,
+          adaptive=False, org_concurrency=10):
+    """Poll uplink statuses every `interval` seconds and write changed rows as JSON lines.
+
+    Per-device uplink config is loaded once and refreshed every `config_refresh`
+    seconds, so steady-state cost is one status call per org with an MX per
+    interval. Each line is the uplink row plus "timestamp" and "changed" (the
+    fields that differ); an uplink that is no longer reported is written once
+    with "removed": true and its last known values. The first poll only
+    establishes the baseline. Progress messages go to stderr so stdout carries
+    nothing but JSON lines. With `profile`, API timings are written there when
+    watching stops.
+    """
+    # Same ceiling as a one-off report: max_threads per org, org_concurrency orgs at once
+    workers = max_threads * org_concurrency
+    metrics = Metrics()
+    client = MerakiClient(
+        api_key,
+        pool_size=workers,
+        limiter=AdaptiveLimiter(workers) if adaptive else None,
+        metrics=metrics if profile else None,
+    )
+    # Devices and networks are re-read from the API at least every config_refresh seconds
+    inventory = Inventory(client, refresh=refresh, ttls={"networks": config_refresh, "devices": config_refresh})
+    try:
+        with redirect_stdout(sys.stderr), metrics.phase("discovery"):
+            orgs = get_all_orgs(inventory)
+        watch_loop(client, inventory, metrics, orgs, max_threads, interval, config_refresh, output, org_concurrency)
+    finally:
+        if profile:
+            with redirect_stdout(sys.stderr):
+                write_profile(metrics, profile)
+
+def watch_loop(client, inventory, metrics, orgs, max_threads, interval, config_refresh, output, org_concurrency=10):
+    states = {}
+    previous = {}
+    first_poll = True
+
+    while True:
+        with redirect_stdout(sys.stderr):
+            stale = [org["id"] for org in orgs
+                     if org["id"] not in states or time.monotonic() - states[org["id"]]["loaded_at"] >= config_refresh]
+            if stale:
+                with metrics.phase("load configs"), ContextExecutor(max_workers=org_concurrency) as executor:
+                    futures = {org_id: executor.submit(load_org_configs, client, inventory, org_id, max_threads, states.get(org_id))
+                               for org_id in stale}
+                for org_id, future in futures.items():
+                    try:
+                        states[org_id] = future.result()
+                    except Exception as e:
+                        # The last loaded state, if any, stays in use until the next refresh
+                        print(f"⚠️  Error loading org {org_id}: {e}")
+
+            # Orgs without an MX have no uplinks to poll
+            polled = {org_id: state for org_id, state in states.items() if state["devices"]}
+            with metrics.phase("poll"), ContextExecutor(max_workers=org_concurrency) as executor:
+                futures = {org_id: executor.submit(poll_org, client, org_id, state) for org_id, state in polled.items()}
+            current = {}
+            for org_id, future in futures.items():
+                try:
+                    current.update(future.result())
+                except Exception as e:
+                    print(f"⚠️  Error polling org {org_id}: {e}")
+                    # Keep the last known rows so a failed poll isn't reported as a change
+                    current.update({key: row for key, row in previous.items() if row["Org ID"] == org_id})
+
+        timestamp = datetime.now(timezone.utc).isoformat()
+        if first_poll:
+            print(f"👀 Watching {len(current)} uplinks across {len(polled)} orgs every {interval}s", file=sys.stderr)
+        else:
+            for key, row in current.items():
+                old = previous.get(key)
+                changed = [field for field in WATCH_FIELDS if old is None or old[field] != row[field]]
+                if changed:
+                    output.write(json.dumps({"timestamp": timestamp, "changed": changed, **row}) + "\n")
+            for key in previous.keys() - current.keys():
+                output.write(json.dumps({"timestamp": timestamp, "removed": True, **previous[key]}) + "\n")
+            output.flush()
+        previous = current
+        first_poll = False
+        time.sleep(interval)
+
+def cli(argv=None):
     parser = argparse.ArgumentParser(description="Report MX/vMX WAN config + status across all orgs")
     parser.add_argument("--api-key", help="Meraki API key or use MERAKI_DASHBOARD_API_KEY")
     parser.add_argument("--csv", help="CSV filename (default ./meraki_wan_report_ALL.csv)")
-    parser.add_argument("--threads", type=int, default=5, help="Number of threads to use (default 5)")
-    args = parser.parse_args()
+    parser.add_argument("--threads", type=int, default=5, help="Concurrent device requests per org (default 5); upper limit with --adaptive")
+    parser.add_argument("--org-concurrency", type=int, default=10, help="Organizations processed at the same time (default 10)")
+    parser.add_argument("--adaptive", action="store_true", help="Adapt requests in flight to latency and 429s (AIMD), up to --threads x --org-concurrency in total")
+    parser.add_argument("--watch", action="store_true", help="Keep running and print only changed or removed uplink rows as JSON lines")
+    parser.add_argument("--interval", type=int, default=60, help="Seconds between status polls in --watch mode (default 60)")
+    parser.add_argument("--config-refresh", type=int, default=3600, help="Seconds between device/config reloads in --watch mode (default 3600)")
+    parser.add_argument("--refresh", action="store_true", help="Re-read orgs, networks and devices from the API instead of the local inventory")
+    parser.add_argument("--profile", nargs="?", const="wan_report_profile.json", metavar="PATH", help="Write per-endpoint API timings as JSON (default wan_report_profile.json)")
+    args = parser.parse_args(argv)
 
     api_key = args.api_key or os.getenv("MERAKI_DASHBOARD_API_KEY")
     if not api_key:
         print("❌ Missing API key. Use --api-key or set MERAKI_DASHBOARD_API_KEY.")
         sys.exit(1)
 
+    if args.watch:
+        try:
+            watch(api_key, args.threads, args.interval, args.config_refresh, sys.stdout, args.profile, args.refresh,
+                  args.adaptive, args.org_concurrency)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+
     csv_path = args.csv or "meraki_wan_report_ALL.csv"
     if not os.path.isabs(csv_path):
         csv_path = os.path.join(os.getcwd(), csv_path)
 
-    main(api_key, csv_path, args.threads)
+    main(api_key, csv_path, args.threads, args.adaptive, args.org_concurrency, args.profile, args.refresh)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1 @@
+"""Shared helpers for the Meraki automation scripts."""
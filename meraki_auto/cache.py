@@ -0,0 +1,29 @@
+import threading
+
+
+class RunCache:
+    """Thread-safe memo for the lifetime of one run.
+
+    Each key is loaded exactly once; threads asking for a key that is still
+    loading wait for that load instead of issuing a duplicate API call.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            key_lock = self._locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    return self._values[key]
+            value = loader()
+            with self._lock:
+                self._values[key] = value
+            return value
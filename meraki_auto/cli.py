@@ -0,0 +1,53 @@
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+# `meraki-auto <command>` entry point for the four tools.
+#
+# A command's script is imported only when that command runs, so
+# `meraki-auto --help` and every other command never pay for its imports
+# (openpyxl, tqdm, ...). pyproject.toml installs the script folders as
+# meraki_auto.<package>; in a plain checkout they are found next to this
+# package instead.
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# command: (installed package, checkout folder, script module, entry function, help)
+COMMANDS = {
+    "ports": ("ports", "switchport_configurator", "update_meraki_ports", "main",
+              "Bulk-update switch ports from a sheet"),
+    "fw-push": ("fw_push", "firewall/meraki-mx-rule-deployer", "meraki_mx_rule_deployer", "main",
+                "Push MX L3 firewall rules from a sheet"),
+    "wan-report": ("wan_report", "firewall/meraki-mx-wan-reporter", "meraki_mx_wan_report", "cli",
+                   "Report MX/vMX WAN config and uplink status across orgs"),
+    "wifi-clients": ("wifi_clients", "wireless/meraki_wireless_client_exporter", "wireless_client_exporter", "main",
+                     "Export wireless clients to xlsx, csv, jsonl or parquet"),
+}
+
+
+def tool_dir(package, folder):
+    installed = Path(__file__).resolve().parent / package
+    return installed if installed.is_dir() else REPO_ROOT / folder
+
+
+def run(command, argv):
+    package, folder, module_name, entry, _ = COMMANDS[command]
+    # The scripts import their sibling modules (port_scheduler, writers, ...) by plain name
+    sys.path.insert(0, str(tool_dir(package, folder)))
+    sys.argv[0] = f"meraki-auto {command}"
+    module = importlib.import_module(module_name)
+    return getattr(module, entry)(argv)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in COMMANDS:
+        return run(argv[0], argv[1:])
+
+    # Only reached for --help, a missing command or an unknown one
+    parser = argparse.ArgumentParser(prog="meraki-auto", description="Meraki Dashboard automation tools.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (*_, help_text) in COMMANDS.items():
+        commands.add_parser(name, help=help_text, add_help=False)
+    parser.parse_args(argv)
@@ -0,0 +1,241 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = os.getenv("MERAKI_API_BASE_URL", "https://api.meraki.com/api/v1")
+ORG_RATE_LIMIT = 10   # Meraki's per-organization budget, requests per second
+ORG_BURST = 10        # Tokens a quiet org may spend at once
+POOL_SIZE = 32        # Keep-alive connections held open by the shared session
+
+
+class TokenBucket:
+    """Thread-safe token bucket. ``acquire`` blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping as needed. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Hold every caller on this bucket for ``seconds`` (used for Retry-After)."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+def retry_after_seconds(response):
+    """Parse a Retry-After header (seconds or HTTP date). Returns None if absent."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class MerakiClient:
+    """Shared Dashboard API client.
+
+    One pooled keep-alive session, a token bucket per organization (calls
+    without an org share one bucket), and 429 handling that honours
+    ``Retry-After`` by pausing the whole org bucket so every thread backs
+    off together. Safe to share across threads.
+
+    Pass an ``AdaptiveLimiter`` as ``limiter`` to also cap the number of
+    requests in flight and let it adapt to latency and throttling, and a
+    ``Metrics`` as ``metrics`` to record per-endpoint timings for ``--profile``.
+    """
+
+    def __init__(self, api_key, base_url=BASE_URL, rate=ORG_RATE_LIMIT, burst=ORG_BURST,
+                 max_retries=5, backoff_factor=1.5, timeout=60, pool_size=POOL_SIZE, limiter=None,
+                 metrics=None):
+        self.base_url = base_url.rstrip("/")
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.limiter = limiter
+        self.metrics = metrics
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        })
+
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def bucket(self, org_id=None):
+        with self._buckets_lock:
+            if org_id not in self._buckets:
+                self._buckets[org_id] = TokenBucket(self.rate, self.burst)
+            return self._buckets[org_id]
+
+    def _backoff(self, attempt):
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, 1)
+
+    def request(self, method, path, org_id=None, params=None, json=None):
+        """Send a request and return the final ``requests.Response``.
+
+        429s are retried for every method; 5xx and connection errors are only
+        retried for GET, since writes such as action batch creation are not
+        idempotent.
+        """
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        bucket = self.bucket(org_id)
+        retry_errors = method.upper() == "GET"
+        timing = {"network": 0.0, "limiter_wait": 0.0, "rate_limit_wait": 0.0, "backoff": 0.0,
+                  "attempts": 0, "throttled": 0, "errors": 0, "bytes_out": 0}
+        started = time.monotonic()
+        response = None
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                timing["rate_limit_wait"] += bucket.acquire()
+                timing["attempts"] += 1
+                try:
+                    response = self._send(method, url, params=params, json=json, timing=timing)
+                except (requests.ConnectionError, requests.Timeout):
+                    timing["errors"] += 1
+                    if not retry_errors or attempt == self.max_retries:
+                        raise
+                    wait = self._backoff(attempt)
+                    time.sleep(wait)
+                    timing["backoff"] += wait
+                    continue
+
+                throttled = response.status_code == 429
+                timing["throttled"] += throttled
+                if attempt < self.max_retries and (throttled or (retry_errors and response.status_code >= 500)):
+                    wait = retry_after_seconds(response)
+                    if wait is None:
+                        wait = self._backoff(attempt)
+                    if throttled:
+                        # Everyone sharing this org's budget backs off, not just this thread
+                        print(f"⏳ Rate limit hit{f' for org {org_id}' if org_id else ''}. Retrying in {wait:.1f}s...")
+                        bucket.pause(wait)
+                    else:
+                        time.sleep(wait)
+                        timing["backoff"] += wait
+                    continue
+                return response
+            return response
+        finally:
+            if self.metrics is not None:
+                self._record(method, url, response, time.monotonic() - started, timing)
+
+    def _send(self, method, url, params=None, json=None, timing=None):
+        if self.limiter is not None:
+            waited = time.monotonic()
+            self.limiter.acquire()
+            if timing is not None:
+                timing["limiter_wait"] += time.monotonic() - waited
+
+        started = time.monotonic()
+        throttled = False
+        sent = None
+        try:
+            response = self.session.request(method, url, params=params, json=json, timeout=self.timeout)
+            sent = response.request
+            throttled = response.status_code == 429
+            return response
+        except requests.RequestException as e:
+            sent = e.request
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            if timing is not None:
+                timing["network"] += elapsed
+                # Every attempt's body went out, not just the last one's
+                body = getattr(sent, "body", None)
+                timing["bytes_out"] += len(body) if body else 0
+            if self.limiter is not None:
+                self.limiter.release(elapsed, throttled)
+
+    def _record(self, method, url, response, latency, timing):
+        bytes_in = len(response.content) if response is not None else 0
+        self.metrics.record(
+            method, url, latency, timing["network"],
+            attempts=timing["attempts"], throttled=timing["throttled"], errors=timing["errors"],
+            bytes_in=bytes_in, bytes_out=timing["bytes_out"],
+            limiter_wait=timing["limiter_wait"], rate_limit_wait=timing["rate_limit_wait"],
+            backoff=timing["backoff"],
+        )
+
+    @property
+    def concurrency(self):
+        """Current in-flight limit, or None when no adaptive limiter is set."""
+        return self.limiter.current if self.limiter else None
+
+    def _json(self, method, path, org_id=None, params=None, json=None):
+        response = self.request(method, path, org_id=org_id, params=params, json=json)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    def get(self, path, org_id=None, params=None):
+        return self._json("GET", path, org_id=org_id, params=params)
+
+    def put(self, path, org_id=None, json=None):
+        return self._json("PUT", path, org_id=org_id, json=json)
+
+    def post(self, path, org_id=None, json=None):
+        return self._json("POST", path, org_id=org_id, json=json)
+
+    def get_page(self, path, org_id=None, params=None):
+        """Fetch one page. Returns ``(items, next_url)``; ``next_url`` is None on the last page.
+
+        The next URL already carries the query string, so pass it back without params.
+        """
+        response = self.request("GET", path, org_id=org_id, params=params)
+        response.raise_for_status()
+        return response.json(), response.links.get("next", {}).get("url")
+
+    def pages(self, path, org_id=None, params=None):
+        """Yield each page of a paginated endpoint by following ``Link: rel=next``."""
+        url = path
+        while url:
+            page, url = self.get_page(url, org_id=org_id, params=params)
+            params = None
+            yield page
+
+    def get_all(self, path, org_id=None, params=None):
+        """Fetch every page of a paginated endpoint into one list."""
+        items = []
+        for page in self.pages(path, org_id=org_id, params=params):
+            items.extend(page)
+        return items
+
@@ -0,0 +1,62 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AdaptiveLimiter:
+    """AIMD limit on requests in flight.
+
+    The limit grows by roughly one slot per round of healthy responses
+    (additive increase) and is halved when the API throttles us
+    (multiplicative decrease). Slow responses stop the growth without
+    cutting the limit. ``max_limit`` is a hard cap, so the fixed thread
+    counts the scripts used to have remain available as an upper bound.
+    """
+
+    def __init__(self, max_limit, initial=None, min_limit=1, latency_target=2.0,
+                 decrease_factor=0.5, cooldown=1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.limit = float(initial or max(min_limit, min(4, max_limit)))
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.cond = threading.Condition()
+
+    @property
+    def current(self):
+        return int(self.limit)
+
+    def acquire(self):
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency, throttled=False):
+        with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                # One cut per cooldown window; a burst of 429s from the same
+                # congestion event should not collapse the limit to the floor
+                if now - self.last_decrease >= self.cooldown:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self.last_decrease = now
+            elif latency <= self.latency_target:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.cond.notify_all()
+
+
+class ContextExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in a copy of the submitting thread's context.
+
+    Plain pool threads start from an empty context, so context variables such
+    as the metrics phase would not follow the work into them.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# Persistent inventory of orgs, networks and devices, shared by all scripts.
+#
+# Topology changes slowly, so every script reads it from a local SQLite file
+# and only goes back to the API when an entry is older than its TTL (or when
+# --refresh is given). Each org's networks and devices are pulled with the
+# paginated org-level endpoints and bulk-upserted; lookups by serial, name,
+# networkId and productType hit indexed columns.
+
+DEFAULT_TTLS = {
+    "orgs": 24 * 3600,
+    "networks": 6 * 3600,
+    "devices": 3600,
+}
+CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "meraki_auto"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orgs (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS networks (
+    id TEXT PRIMARY KEY,
+    org_id TEXT NOT NULL,
+    name TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS networks_org ON networks (org_id);
+CREATE TABLE IF NOT EXISTS devices (
+    serial TEXT PRIMARY KEY,
+    org_id TEXT NOT NULL,
+    network_id TEXT,
+    name_key TEXT,
+    model TEXT,
+    product_type TEXT,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS devices_org ON devices (org_id, product_type);
+CREATE INDEX IF NOT EXISTS devices_network ON devices (network_id, product_type);
+CREATE INDEX IF NOT EXISTS devices_name ON devices (name_key);
+CREATE TABLE IF NOT EXISTS refreshed (
+    scope TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL
+);
+"""
+
+
+def default_inventory_path(client):
+    """One inventory file per API key and API host, so orgs never leak between keys."""
+    if os.getenv("MERAKI_INVENTORY_DB"):
+        return Path(os.getenv("MERAKI_INVENTORY_DB"))
+    identity = f"{client.session.headers.get('Authorization')}|{client.base_url}"
+    return CACHE_DIR / f"inventory-{hashlib.sha256(identity.encode()).hexdigest()[:12]}.db"
+
+
+class Inventory:
+    """SQLite-backed orgs/networks/devices store with per-entity TTLs. Safe to share across threads.
+
+    With ``refresh=True`` every scope is fetched again the first time it is
+    used in this run, then served from the store.
+    """
+
+    def __init__(self, client, path=None, refresh=False, ttls=None):
+        self.client = client
+        self.path = Path(path) if path else default_inventory_path(client)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.refresh = refresh
+        self.run_started = time.time()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.scope_locks = {}
+
+    # ---- freshness ----
+
+    def _fresh_since(self, kind):
+        """Entries refreshed before this time are stale."""
+        cutoff = time.time() - self.ttls[kind]
+        return max(cutoff, self.run_started) if self.refresh else cutoff
+
+    def _scope_fresh(self, scope, kind):
+        with self.lock:
+            row = self.db.execute("SELECT refreshed_at FROM refreshed WHERE scope = ?", (scope,)).fetchone()
+        return bool(row) and row[0] >= self._fresh_since(kind)
+
+    def _mark(self, scope):
+        self.db.execute(
+            "INSERT INTO refreshed (scope, refreshed_at) VALUES (?, ?) "
+            "ON CONFLICT (scope) DO UPDATE SET refreshed_at = excluded.refreshed_at",
+            (scope, time.time()),
+        )
+
+    def _load(self, scope, kind, fetch):
+        """Run `fetch` once per stale scope, even when several threads ask at the same time."""
+        with self.lock:
+            scope_lock = self.scope_locks.setdefault(scope, threading.Lock())
+        with scope_lock:
+            if not self._scope_fresh(scope, kind):
+                fetch()
+
+    def _rows(self, sql, args=()):
+        with self.lock:
+            return [json.loads(data) for (data,) in self.db.execute(sql, args)]
+
+    # ---- orgs ----
+
+    def orgs(self):
+        self._load("orgs", "orgs", self._fetch_orgs)
+        return self._rows("SELECT data FROM orgs ORDER BY name")
+
+    def _fetch_orgs(self):
+        orgs = self.client.get_all("/organizations")
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM orgs")
+            self.db.executemany("INSERT INTO orgs (id, name, data) VALUES (?, ?, ?)",
+                                [(o["id"], o.get("name"), json.dumps(o)) for o in orgs])
+            self._mark("orgs")
+
+    # ---- networks ----
+
+    def networks(self, org_id):
+        self._load(f"networks:{org_id}", "networks", lambda: self._fetch_networks(org_id))
+        return self._rows("SELECT data FROM networks WHERE org_id = ? ORDER BY name", (org_id,))
+
+    def network(self, network_id):
+        rows = self._rows("SELECT data FROM networks WHERE id = ?", (network_id,))
+        return rows[0] if rows else None
+
+    def _fetch_networks(self, org_id):
+        networks = self.client.get_all(f"/organizations/{org_id}/networks", org_id=org_id, params={"perPage": 100000})
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM networks WHERE org_id = ?", (org_id,))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO networks (id, org_id, name, data) VALUES (?, ?, ?, ?)",
+                [(n["id"], org_id, n.get("name"), json.dumps(n)) for n in networks],
+            )
+            self._mark(f"networks:{org_id}")
+
+    # ---- devices ----
+
+    def devices(self, org_id, product_types=None):
+        """Every device in the org, optionally limited to some product types."""
+        self._load(f"devices:{org_id}", "devices", lambda: self._fetch_devices(org_id))
+        sql, args = "SELECT data FROM devices WHERE org_id = ?", [org_id]
+        if product_types:
+            sql += f" AND product_type IN ({', '.join('?' * len(product_types))})"
+            args += list(product_types)
+        return self._rows(sql + " ORDER BY serial", args)
+
+    def _fetch_devices(self, org_id):
+        devices = self.client.get_all(f"/organizations/{org_id}/devices", org_id=org_id, params={"perPage": 1000})
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM devices WHERE org_id = ?", (org_id,))
+            self._upsert_devices(org_id, devices)
+            self._mark(f"devices:{org_id}")
+
+    def _upsert_devices(self, org_id, devices):
+        now = time.time()
+        self.db.executemany(
+            """INSERT INTO devices (serial, org_id, network_id, name_key, model, product_type, updated_at, data)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (serial) DO UPDATE SET
+                   org_id = excluded.org_id, network_id = excluded.network_id, name_key = excluded.name_key,
+                   model = excluded.model, product_type = excluded.product_type,
+                   updated_at = excluded.updated_at, data = excluded.data""",
+            [(d["serial"], org_id, d.get("networkId"), (d.get("name") or "").strip().upper() or None,
+              d.get("model"), d.get("productType"), now, json.dumps({**d, "organizationId": org_id}))
+             for d in devices],
+        )
+
+    def add_devices(self, org_id, devices):
+        """Bulk upsert devices found some other way (e.g. a filtered lookup)."""
+        with self.lock, self.db:
+            self._upsert_devices(org_id, devices)
+
+    def find_devices(self, refs):
+        """Fresh cached devices for serial/name refs (case-insensitive). Returns {REF: device}."""
+        refs = [ref.strip().upper() for ref in refs]
+        found = {}
+        since = self._fresh_since("devices")
+        for i in range(0, len(refs), 500):
+            chunk = refs[i:i + 500]
+            marks = ", ".join("?" * len(chunk))
+            with self.lock:
+                rows = self.db.execute(
+                    f"SELECT serial, name_key, data FROM devices WHERE updated_at >= ? "
+                    f"AND (serial IN ({marks}) OR name_key IN ({marks}))",
+                    [since, *chunk, *chunk],
+                ).fetchall()
+            wanted = set(chunk)
+            for serial, name_key, data in rows:
+                device = json.loads(data)
+                for key in (serial.upper(), name_key):
+                    if key in wanted:
+                        found[key] = device
+        return found
+
+    def devices_in_networks(self, network_ids, product_type=None):
+        """Cached devices in the given networks (no API call)."""
+        network_ids = list(network_ids)
+        if not network_ids:
+            return []
+        sql = f"SELECT data FROM devices WHERE network_id IN ({', '.join('?' * len(network_ids))})"
+        args = network_ids
+        if product_type:
+            sql += " AND product_type = ?"
+            args = network_ids + [product_type]
+        return self._rows(sql, args)
+
+    def devices_fresh(self, org_id):
+        """True when the org's full device list is cached and within its TTL."""
+        return self._scope_fresh(f"devices:{org_id}", "devices")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
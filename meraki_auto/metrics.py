@@ -0,0 +1,187 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+# Path segments that follow these collections are IDs. Endpoints are grouped
+# by template (e.g. /devices/{serial}/switch/ports/{portId}) so thousands of
+# per-device calls report as one line.
+ID_SEGMENTS = {
+    "organizations": "{organizationId}",
+    "networks": "{networkId}",
+    "devices": "{serial}",
+    "ports": "{portId}",
+    "actionBatches": "{actionBatchId}",
+}
+# Literal sub-resources that sit where an ID could be
+LITERAL_SEGMENTS = {"bySwitch"}
+API_PREFIX = re.compile(r"^/api/v\d+")
+
+
+def endpoint_template(url):
+    """Map a concrete URL or path to its endpoint template, without the query string."""
+    path = API_PREFIX.sub("", urlparse(url).path)
+    segments = path.strip("/").split("/")
+    for i in range(1, len(segments)):
+        placeholder = ID_SEGMENTS.get(segments[i - 1])
+        if placeholder and segments[i] not in LITERAL_SEGMENTS:
+            segments[i] = placeholder
+    return "/" + "/".join(segments)
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    return {
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1] * 1000, 1),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 1),
+    }
+
+
+class EndpointStats:
+    __slots__ = ("calls", "attempts", "throttled", "errors", "bytes_in", "bytes_out",
+                 "latencies", "network_times", "limiter_wait", "rate_limit_wait", "backoff")
+
+    def __init__(self):
+        self.calls = self.attempts = self.throttled = self.errors = 0
+        self.bytes_in = self.bytes_out = 0
+        self.latencies = []
+        self.network_times = []
+        self.limiter_wait = self.rate_limit_wait = self.backoff = 0.0
+
+
+class Metrics:
+    """Per-endpoint API instrumentation, grouped by the phase that was running.
+
+    ``MerakiClient`` calls ``record`` once per logical request (retries
+    included). Scripts wrap their stages in ``with metrics.phase("diff"):`` so
+    the report shows which stage the time went to. Thread-safe.
+
+    The phase lives in a context variable, so each thread (or asyncio task)
+    has its own. Worker threads see the phase of the code that started them
+    when they are run through ``concurrency.ContextExecutor`` (or any other
+    way of running in a copy of the caller's context).
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.started_monotonic = time.monotonic()
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.phases = {}
+        self._phase = ContextVar(f"metrics_phase_{id(self)}", default="run")
+
+    @property
+    def current_phase(self):
+        return self._phase.get()
+
+    @contextmanager
+    def phase(self, name):
+        token = self._phase.set(name)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases[name] = self.phases.get(name, 0.0) + time.monotonic() - started
+            self._phase.reset(token)
+
+    def record(self, method, url, latency, network_time, attempts=1, throttled=0, errors=0,
+               bytes_in=0, bytes_out=0, limiter_wait=0.0, rate_limit_wait=0.0, backoff=0.0):
+        key = (self._phase.get(), f"{method.upper()} {endpoint_template(url)}")
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = EndpointStats()
+            stats.calls += 1
+            stats.attempts += attempts
+            stats.throttled += throttled
+            stats.errors += errors
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+            stats.latencies.append(latency)
+            stats.network_times.append(network_time)
+            stats.limiter_wait += limiter_wait
+            stats.rate_limit_wait += rate_limit_wait
+            stats.backoff += backoff
+
+    def report(self):
+        with self.lock:
+            endpoints = []
+            for (phase, endpoint), s in self.endpoints.items():
+                endpoints.append({
+                    "phase": phase,
+                    "endpoint": endpoint,
+                    "calls": s.calls,
+                    "retries": s.attempts - s.calls,
+                    "throttled": s.throttled,
+                    "errors": s.errors,
+                    "bytes_in": s.bytes_in,
+                    "bytes_out": s.bytes_out,
+                    "latency_ms": percentiles(s.latencies),
+                    "network_ms": percentiles(s.network_times),
+                    "total_s": round(sum(s.latencies), 3),
+                    "network_s": round(sum(s.network_times), 3),
+                    "limiter_wait_s": round(s.limiter_wait, 3),
+                    "rate_limit_wait_s": round(s.rate_limit_wait, 3),
+                    "backoff_s": round(s.backoff, 3),
+                })
+            phases = dict(self.phases)
+        endpoints.sort(key=lambda e: e["total_s"], reverse=True)
+
+        totals = {field: sum(e[field] for e in endpoints) for field in (
+            "calls", "retries", "throttled", "errors", "bytes_in", "bytes_out")}
+        for field in ("total_s", "network_s", "limiter_wait_s", "rate_limit_wait_s", "backoff_s"):
+            totals[field] = round(sum(e[field] for e in endpoints), 3)
+
+        phase_report = {}
+        for name, wall in phases.items():
+            in_phase = [e for e in endpoints if e["phase"] == name]
+            phase_report[name] = {
+                "wall_s": round(wall, 3),
+                "calls": sum(e["calls"] for e in in_phase),
+                "network_s": round(sum(e["network_s"] for e in in_phase), 3),
+                "wait_s": round(sum(e["limiter_wait_s"] + e["rate_limit_wait_s"] + e["backoff_s"] for e in in_phase), 3),
+            }
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "wall_s": round(time.monotonic() - self.started_monotonic, 3),
+            "totals": totals,
+            "phases": phase_report,
+            "endpoints": endpoints,
+        }
+
+    def write(self, path):
+        """Write the JSON report to ``path`` and return the report."""
+        report = self.report()
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def format_summary(report, top=5):
+    """A few console lines: phase timings and the most expensive endpoints."""
+    totals = report["totals"]
+    lines = [
+        f"📈 {totals['calls']} API calls, {totals['retries']} retries, {totals['throttled']} throttled; "
+        f"network {totals['network_s']:.1f}s, limiter wait {totals['limiter_wait_s']:.1f}s, "
+        f"rate-limit wait {totals['rate_limit_wait_s']:.1f}s (summed across threads)"
+    ]
+    for name, phase in report["phases"].items():
+        lines.append(f"   {name}: {phase['wall_s']:.1f}s wall, {phase['calls']} calls")
+    for e in report["endpoints"][:top]:
+        latency = e["latency_ms"]
+        lines.append(f"   {e['endpoint']} [{e['phase']}]: {e['calls']} calls, "
+                     f"p50 {latency.get('p50')}ms p95 {latency.get('p95')}ms p99 {latency.get('p99')}ms")
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+# Port-level work scheduler.
+#
+# Tasks are queued per switch and handed to a shared pool of workers in
+# round-robin order across switches, with a cap on how many tasks for the
+# same switch may run at once. A switch with hundreds of rows no longer pins
+# a single worker while the others sit idle.
+#
+# status: optional callable returning extra text (e.g. the current adaptive
+# concurrency) for the progress line printed every `progress_every` tasks.
+class PortScheduler:
+    def __init__(self, workers, per_switch_limit=2, status=None, progress_every=50):
+        self.workers = workers
+        self.per_switch_limit = per_switch_limit
+        self.status = status
+        self.progress_every = progress_every
+        self.busy_time = 0.0
+        self.wall_time = 0.0
+        # Thread-seconds actually available: wall time x threads started, per run
+        self.capacity = 0.0
+        self.threads_used = 0
+        self.tasks_run = 0
+
+    # tasks: iterable of (serial, fn, args). Returns results in submission order.
+    def run(self, tasks):
+        queues = OrderedDict()
+        count = 0
+        for index, (serial, fn, fn_args) in enumerate(tasks):
+            queues.setdefault(serial, deque()).append((index, fn, fn_args))
+            count += 1
+
+        results = [None] * count
+        in_flight = {serial: 0 for serial in queues}
+        order = deque(queues)
+        cond = threading.Condition()
+        busy = [0.0]
+        done = [0]
+
+        # Next runnable task, rotating across switches so they take turns
+        def next_task():
+            for _ in range(len(order)):
+                serial = order[0]
+                order.rotate(-1)
+                if queues[serial] and in_flight[serial] < self.per_switch_limit:
+                    in_flight[serial] += 1
+                    return serial, queues[serial].popleft()
+            return None
+
+        def worker():
+            while True:
+                with cond:
+                    picked = next_task()
+                    while picked is None:
+                        if not any(queues.values()):
+                            return
+                        cond.wait()
+                        picked = next_task()
+
+                serial, (index, fn, fn_args) = picked
+                started = time.perf_counter()
+                try:
+                    results[index] = fn(*fn_args)
+                except Exception as e:
+                    print(f"⚠️  Task for {serial} failed: {e}")
+                elapsed = time.perf_counter() - started
+
+                with cond:
+                    in_flight[serial] -= 1
+                    busy[0] += elapsed
+                    done[0] += 1
+                    if self.status and done[0] % self.progress_every == 0:
+                        print(f"   … {done[0]}/{count} tasks done{self.status()}")
+                    cond.notify_all()
+
+        started = time.perf_counter()
+        # Each worker runs in its own copy of the caller's context (e.g. the metrics phase)
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(worker,), daemon=True)
+                   for _ in range(min(self.workers, count))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        wall = time.perf_counter() - started
+        self.wall_time += wall
+        self.capacity += wall * len(threads)
+        self.threads_used = max(self.threads_used, len(threads))
+        self.busy_time += busy[0]
+        self.tasks_run += count
+        return results
+
+    # Fraction of started worker time spent running tasks (runs with fewer
+    # tasks than workers only start one thread per task)
+    def utilization(self):
+        return self.busy_time / self.capacity if self.capacity else 0.0
+
+    def summary(self):
+        return (f"🧵 {self.tasks_run} tasks on {self.threads_used} of {self.workers} workers "
+                f"(max {self.per_switch_limit} per switch), "
+                f"busy {self.busy_time:.1f}s over {self.wall_time:.1f}s wall, "
+                f"utilization {self.utilization():.0%}"
+                f"{self.status() if self.status else ''}")
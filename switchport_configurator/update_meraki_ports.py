@@ -1,62 +1,138 @@
 import os
+import sys
+import csv
+import json
 import time
-import openpyxl
+import hashlib
 import requests
 import argparse
-from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, deque
+from port_scheduler import PortScheduler
 
-# ========== ARGUMENTS AND API KEY SETUP ==========
-parser = argparse.ArgumentParser(description="Update Meraki switch ports in bulk.")
-parser.add_argument(
-    "--api-key",
-    help="Meraki Dashboard API key (or use MERAKI_DASHBOARD_API_KEY environment variable)"
-)
-args = parser.parse_args()
-
-# Use CLI arg or fallback to environment variable
-MERAKI_API_KEY = args.api_key or os.getenv("MERAKI_DASHBOARD_API_KEY")
-
-if not MERAKI_API_KEY:
-    raise ValueError("❌ API key is missing. Use --api-key or set MERAKI_DASHBOARD_API_KEY as an environment variable.")
-# ==================================================
+# Make the shared meraki_auto package importable when run as a plain script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from meraki_auto.client import MerakiClient
+from meraki_auto.concurrency import AdaptiveLimiter
+from meraki_auto.inventory import Inventory
+from meraki_auto.metrics import Metrics, format_summary
 
 # ==== CONFIGURATION ====
-BASE_URL = 'https://api.meraki.com/api/v1'
-MAX_THREADS = 10  # Adjust based on rate limit tolerance
+MAX_REQUESTS_PER_SWITCH = 2  # Concurrent requests allowed against a single switch
 EXCEL_FILENAME = 'port_descriptions.xlsx'
+SNAPSHOT_PER_PAGE = 50  # Max page size for the org-level bySwitch endpoint
+ACTION_BATCH_SIZE = 100  # Max actions per asynchronous action batch
+MAX_RUNNING_BATCHES = 5  # Meraki allows 5 running asynchronous batches per org
+BATCH_POLL_INTERVAL = 2  # Seconds between action batch status checks
+BATCH_TIMEOUT = 900  # Seconds before an unfinished action batch is reported as unknown
+MAX_POLL_FAILURES = 5  # Consecutive failed status checks before a batch is reported as unknown
+SHEET_COLUMNS = ('description', 'type', 'vlan', 'voice_vlan', 'native_vlan', 'allowed_vlans')
 # ========================
 
-# Start script timer
-start_time = time.time()
-
-# Create a session object for connection reuse
-session = requests.Session()
-session.headers.update({
-    'X-Cisco-Meraki-API-Key': MERAKI_API_KEY,
-    'Content-Type': 'application/json'
-})
-
-# Load Excel workbook from the same folder as the script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-excel_path = os.path.join(script_dir, EXCEL_FILENAME)
-wb = openpyxl.load_workbook(excel_path)
-sheet = wb.active
-
-# Group port updates by switch serial
-switch_ports = defaultdict(list)
-
-for row in sheet.iter_rows(min_row=2, values_only=True):
-    switch_serial, port_number, description, port_type, vlan, voice_vlan, native_vlan, allowed_vlans = row
-    switch_ports[switch_serial].append({
-        'port': port_number,
-        'description': description,
-        'type': port_type,
-        'vlan': vlan,
-        'voice_vlan': voice_vlan,
-        'native_vlan': native_vlan,
-        'allowed_vlans': allowed_vlans
-    })
+# ========== ARGUMENTS AND API KEY SETUP ==========
+def parse_args(argv=None):
+    # The default sheet is read from the current directory, or else from next to the script
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    default_sheet = EXCEL_FILENAME if os.path.exists(EXCEL_FILENAME) else os.path.join(script_dir, EXCEL_FILENAME)
+    parser = argparse.ArgumentParser(description="Update Meraki switch ports in bulk.")
+    parser.add_argument(
+        "--api-key",
+        help="Meraki Dashboard API key (or use MERAKI_DASHBOARD_API_KEY environment variable)"
+    )
+    parser.add_argument(
+        "--org-id",
+        help="Organization ID. When set, all switch ports are snapshotted with the org-level bySwitch endpoint"
+    )
+    parser.add_argument(
+        "--sheet",
+        default=default_sheet,
+        help=f"Port sheet, .xlsx or .csv with the same columns (default {EXCEL_FILENAME} in the current directory or next to the script)"
+    )
+    parser.add_argument(
+        "--action-batches",
+        action="store_true",
+        help="Submit port changes as asynchronous organization action batches (requires --org-id)"
+    )
+    parser.add_argument(
+        "--max-threads",
+        type=int,
+        default=10,
+        help="Worker threads, and the upper limit on requests in flight with --adaptive (default 10)"
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt the number of requests in flight (AIMD) to latency and 429s, up to --max-threads"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Re-read the org's device list from the API instead of the local inventory (with --org-id)"
+    )
+    parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        help="Keep running: watch the sheet and push only rows that changed since they were last applied"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=10,
+        help="Seconds between sheet checks in --reconcile mode (default 10)"
+    )
+    parser.add_argument(
+        "--sweep-interval",
+        type=float,
+        default=3600,
+        help="Seconds between full re-diffs of every port in --reconcile mode (default 3600)"
+    )
+    parser.add_argument(
+        "--state",
+        help="Last-applied state file for --reconcile (default <sheet name>_applied.json next to the sheet)"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="ports_profile.json",
+        metavar="PATH",
+        help="Write per-endpoint API timings as JSON (default ports_profile.json)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.action_batches and not args.org_id:
+        parser.error("--action-batches requires --org-id")
+    return args
+# ==================================================
+
+# Load the sheet (xlsx, or csv with the same columns) grouped by switch serial
+def load_sheet(path):
+    if path.lower().endswith('.csv'):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            rows = [[cell.strip() or None for cell in row] for row in reader]
+    else:
+        # Imported here so CSV sheets and --help don't pay for openpyxl
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True)
+        rows = list(wb.active.iter_rows(min_row=2, values_only=True))
+        wb.close()
+
+    switch_ports = defaultdict(list)
+    for row in rows:
+        row = (list(row) + [None] * 8)[:8]
+        switch_serial, port_number, description, port_type, vlan, voice_vlan, native_vlan, allowed_vlans = row
+        if not switch_serial or port_number is None:
+            continue
+        switch_ports[switch_serial].append({
+            'port': port_number,
+            'description': description,
+            'type': port_type,
+            'vlan': vlan,
+            'voice_vlan': voice_vlan,
+            'native_vlan': native_vlan,
+            'allowed_vlans': allowed_vlans
+        })
+    return switch_ports
 
 # Normalize strings for comparison
 def normalize(value):
@@ -67,71 +143,377 @@ def normalize(value):
         return value.lower() if value else None
     return value
 
-# Update all ports for a given switch
-def update_switch_ports(serial, ports):
-    for port_data in ports:
-        port_number = port_data['port']
-        url = f'{BASE_URL}/devices/{serial}/switch/ports/{port_number}'
+# Index a switch's port list by port ID (spreadsheet port numbers may be ints)
+def index_ports(ports):
+    return {str(port['portId']): port for port in ports}
+
+# Snapshot every port on one switch with a single call
+def fetch_switch_snapshot(client, org_id, serial):
+    return index_ports(client.get(f'/devices/{serial}/switch/ports', org_id=org_id))
+
+# Snapshot every port on the given switches using the org-level bySwitch endpoint
+def fetch_org_snapshot(client, org_id, serials):
+    snapshot = {}
+    path = f'/organizations/{org_id}/switch/ports/bySwitch'
+    for i in range(0, len(serials), SNAPSHOT_PER_PAGE):
+        params = {'perPage': SNAPSHOT_PER_PAGE, 'serials[]': serials[i:i + SNAPSHOT_PER_PAGE]}
+        for switch in client.get_all(path, org_id=org_id, params=params):
+            snapshot[switch['serial']] = index_ports(switch.get('ports', []))
+    return snapshot
+
+# Build the PUT payload for the fields that differ from the current config
+def build_payload(port_data, current_config):
+    payload = {}
+
+    if normalize(port_data['description']) and normalize(current_config.get('name')) != normalize(port_data['description']):
+        payload["name"] = port_data['description']
+
+    port_type = normalize(port_data['type'])
+    if port_type and normalize(current_config.get('type')) != port_type:
+        payload["type"] = port_type
 
-        # Get current config
+    if port_type == 'access':
+        if port_data['vlan'] is not None and current_config.get('vlan') != int(port_data['vlan']):
+            payload["vlan"] = int(port_data['vlan'])
+        if port_data['voice_vlan'] is not None and current_config.get('voiceVlan') != int(port_data['voice_vlan']):
+            payload["voiceVlan"] = int(port_data['voice_vlan'])
+
+    elif port_type == 'trunk':
+        if port_data['native_vlan'] is not None and current_config.get('nativeVlan') != int(port_data['native_vlan']):
+            payload["nativeVlan"] = int(port_data['native_vlan'])
+        if normalize(port_data['allowed_vlans']) and normalize(current_config.get('allowedVlans')) != normalize(port_data['allowed_vlans']):
+            payload["allowedVlans"] = str(port_data['allowed_vlans'])
+
+    return payload
+
+# Diff all ports for a given switch against an in-memory snapshot
+# Returns (changes, in_sync): (serial, port_number, payload) for ports that need
+# changes, and the port numbers that already match the sheet
+def diff_switch_ports(client, org_id, serial, ports, current_ports=None):
+    if current_ports is None:
         try:
-            response = session.get(url)
-            response.raise_for_status()
-            current_config = response.json()
+            current_ports = fetch_switch_snapshot(client, org_id, serial)
         except Exception as e:
-            print(f"❌ Failed to fetch config for {serial} port {port_number}: {e}")
+            print(f"❌ Failed to fetch port configs for {serial}: {e}")
+            return [], []
+
+    changes = []
+    in_sync = []
+    for port_data in ports:
+        port_number = port_data['port']
+        current_config = current_ports.get(str(port_number))
+        if current_config is None:
+            print(f"❌ Port {port_number} not found on {serial}")
             continue
 
-        payload = {}
-        changed = False
-
-        if normalize(port_data['description']) and normalize(current_config.get('name')) != normalize(port_data['description']):
-            payload["name"] = port_data['description']
-            changed = True
-
-        port_type = normalize(port_data['type'])
-        if port_type and normalize(current_config.get('type')) != port_type:
-            payload["type"] = port_type
-            changed = True
-
-        if port_type == 'access':
-            if port_data['vlan'] is not None and current_config.get('vlan') != int(port_data['vlan']):
-                payload["vlan"] = int(port_data['vlan'])
-                changed = True
-            if port_data['voice_vlan'] is not None and current_config.get('voiceVlan') != int(port_data['voice_vlan']):
-                payload["voiceVlan"] = int(port_data['voice_vlan'])
-                changed = True
-
-        elif port_type == 'trunk':
-            if port_data['native_vlan'] is not None and current_config.get('nativeVlan') != int(port_data['native_vlan']):
-                payload["nativeVlan"] = int(port_data['native_vlan'])
-                changed = True
-            if normalize(port_data['allowed_vlans']) and normalize(current_config.get('allowedVlans')) != normalize(port_data['allowed_vlans']):
-                payload["allowedVlans"] = str(port_data['allowed_vlans'])
-                changed = True
-
-        if not changed:
+        payload = build_payload(port_data, current_config)
+        if not payload:
             print(f"⏭️  Skipping port {port_number} on {serial} (no changes).")
+            in_sync.append(port_number)
+            continue
+        changes.append((serial, port_number, payload))
+    return changes, in_sync
+
+# Send a single port update to Meraki. Returns True when the port was updated
+def put_port(client, org_id, serial, port_number, payload):
+    path = f'/devices/{serial}/switch/ports/{port_number}'
+    try:
+        put_response = client.request('PUT', path, org_id=org_id, json=payload)
+        if put_response.status_code == 200:
+            print(f"✅ Updated port {port_number} on {serial}")
+            return True
+        print(f"❌ Failed port {port_number} on {serial}: {put_response.status_code} {put_response.text}")
+    except Exception as e:
+        print(f"⚠️  Error updating port {port_number} on {serial}: {e}")
+    return False
+
+# Create an asynchronous action batch for a chunk of port changes
+def create_action_batch(client, org_id, chunk):
+    actions = [{
+        'resource': f'/devices/{serial}/switch/ports/{port_number}',
+        'operation': 'update',
+        'body': payload
+    } for serial, port_number, payload in chunk]
+    batch = client.post(
+        f'/organizations/{org_id}/actionBatches',
+        org_id=org_id,
+        json={'confirmed': True, 'synchronous': False, 'actions': actions}
+    )
+    if not isinstance(batch, dict) or 'id' not in batch:
+        raise ValueError(f"unexpected action batch response: {str(batch)[:200]}")
+    return batch['id']
+
+def get_action_batch_status(client, org_id, batch_id):
+    batch = client.get(f'/organizations/{org_id}/actionBatches/{batch_id}', org_id=org_id)
+    status = batch.get('status') if isinstance(batch, dict) else None
+    if not isinstance(status, dict):
+        raise ValueError(f"unexpected action batch status: {str(batch)[:200]}")
+    return status
+
+# Map a finished batch back to its serial/port rows (batches are applied atomically)
+# Returns True when the batch succeeded
+def report_action_batch(batch_id, chunk, status):
+    if status.get('completed') and not status.get('failed'):
+        for serial, port_number, _ in chunk:
+            print(f"✅ Updated port {port_number} on {serial}")
+        return True
+    errors = '; '.join(str(e) for e in status.get('errors', [])) or 'unknown error'
+    for serial, port_number, _ in chunk:
+        print(f"❌ Failed port {port_number} on {serial}: action batch {batch_id} failed: {errors}")
+    return False
+
+# The batch may still apply later, so these ports are neither retried nor recorded as applied
+def report_unknown_batch(batch_id, chunk, reason):
+    for serial, port_number, _ in chunk:
+        print(f"❓ Unknown result for port {port_number} on {serial}: action batch {batch_id} {reason}")
+
+# Push changes through action batches, polling until every batch finishes or times out
+# Returns (remaining, applied): the changes that still need a per-port PUT
+# (action batches unavailable or not created) and the changes the batches applied
+def submit_action_batches(client, org_id, changes):
+    chunks = deque(changes[i:i + ACTION_BATCH_SIZE] for i in range(0, len(changes), ACTION_BATCH_SIZE))
+    running = {}
+    deadlines = {}
+    poll_failures = defaultdict(int)
+    applied = []
+    fallback = []
+    accepted = False
+
+    while chunks or running:
+        while chunks and len(running) < MAX_RUNNING_BATCHES:
+            chunk = chunks.popleft()
+            try:
+                batch_id = create_action_batch(client, org_id, chunk)
+            except ValueError as e:
+                # Malformed response (no batch ID): nothing is running, so PUT these ports instead
+                print(f"⚠️  Action batch not created ({e}), falling back to per-port updates for {len(chunk)} ports")
+                fallback.extend(chunk)
+                continue
+            except requests.RequestException as e:
+                if not accepted:
+                    print(f"⚠️  Action batches unavailable for org {org_id}, falling back to per-port updates: {e}")
+                    return fallback + [change for pending in [chunk, *chunks] for change in pending], applied
+                report_action_batch('(not created)', chunk, {'failed': True, 'errors': [e]})
+                continue
+            accepted = True
+            running[batch_id] = chunk
+            deadlines[batch_id] = time.monotonic() + BATCH_TIMEOUT
+            print(f"📦 Submitted action batch {batch_id} ({len(chunk)} ports)")
+
+        if not running:
             continue
+        time.sleep(BATCH_POLL_INTERVAL)
+        for batch_id in list(running):
+            try:
+                status = get_action_batch_status(client, org_id, batch_id)
+            except (requests.RequestException, ValueError) as e:
+                # Transport errors and malformed bodies both count toward MAX_POLL_FAILURES
+                poll_failures[batch_id] += 1
+                print(f"⚠️  Could not poll action batch {batch_id}: {e}")
+                if poll_failures[batch_id] >= MAX_POLL_FAILURES:
+                    report_unknown_batch(batch_id, running.pop(batch_id), f"could not be polled {MAX_POLL_FAILURES} times in a row")
+                continue
+            poll_failures[batch_id] = 0
+            if status.get('completed') or status.get('failed'):
+                chunk = running.pop(batch_id)
+                if report_action_batch(batch_id, chunk, status):
+                    applied.extend(chunk)
+            elif time.monotonic() > deadlines[batch_id]:
+                report_unknown_batch(batch_id, running.pop(batch_id), f"did not finish within {BATCH_TIMEOUT}s")
 
-        # Send update to Meraki
+    return fallback, applied
+
+# Push changes (action batches first when enabled, then per-port PUTs interleaved
+# fairly across switches). Returns the (serial, port_number) pairs that were applied
+def push_changes(client, args, scheduler, changes):
+    applied = []
+    if args.action_batches and changes:
+        changes, applied = submit_action_batches(client, args.org_id, changes)
+    results = scheduler.run((serial, put_port, (client, args.org_id, serial, port_number, payload))
+                            for serial, port_number, payload in changes)
+    applied += [change for change, ok in zip(changes, results) if ok]
+    return [(serial, port_number) for serial, port_number, _ in applied]
+
+# Drop sheet serials that are not switches in the org before any port calls
+def check_serials(inventory, org_id, switch_ports):
+    try:
+        known = {d['serial'] for d in inventory.devices(org_id, product_types=['switch'])}
+    except Exception as e:
+        print(f"⚠️  Could not check serials against the org inventory: {e}")
+        return
+    for serial in [serial for serial in switch_ports if serial not in known]:
+        print(f"❌ {serial} is not a switch in org {org_id}, skipping (use --refresh if it was just added)")
+        del switch_ports[serial]
+
+# Snapshot, diff and push every row in the sheet
+# Returns the (serial, port_number) pairs that now match the sheet
+def sync_ports(client, args, inventory, scheduler, metrics, switch_ports):
+    # Snapshot the whole org up front when an org ID was given
+    snapshots = {}
+    if args.org_id:
+        with metrics.phase("discovery"):
+            check_serials(inventory, args.org_id, switch_ports)
+            try:
+                snapshots = fetch_org_snapshot(client, args.org_id, list(switch_ports))
+            except Exception as e:
+                print(f"⚠️  Org-level snapshot failed, falling back to per-switch snapshots: {e}")
+
+    # Snapshot and diff every switch (one request per switch at most)
+    with metrics.phase("diff"):
+        results = scheduler.run(
+            (serial, diff_switch_ports, (client, args.org_id, serial, ports, snapshots.get(serial)))
+            for serial, ports in switch_ports.items()
+        )
+    changes = []
+    synced = []
+    for serial, result in zip(switch_ports, results):
+        if result:
+            changes += result[0]
+            synced += [(serial, port_number) for port_number in result[1]]
+
+    with metrics.phase("push"):
+        synced += push_changes(client, args, scheduler, changes)
+    return synced
+
+# ========== RECONCILE MODE ==========
+# Rows are identified by serial/port. The state file maps each row to the hash
+# of the sheet values last applied to it, so a saved sheet only pushes rows
+# whose hash changed. Those rows are sent as full payloads without reading the
+# port first; the periodic sweep re-diffs every port against the live config
+# and picks up failed pushes and changes made outside the sheet.
+
+def row_key(serial, port_number):
+    return f"{serial}/{port_number}"
+
+def row_hash(port_data):
+    values = [str(port_data[column]) if port_data[column] is not None else None for column in SHEET_COLUMNS]
+    return hashlib.sha256(json.dumps(values).encode()).hexdigest()
+
+def load_applied_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_applied_state(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# Push rows changed since they were last applied, without a fresh snapshot
+def apply_rows(client, args, scheduler, metrics, switch_ports):
+    changes = []
+    for serial, ports in switch_ports.items():
+        for port_data in ports:
+            payload = build_payload(port_data, {})
+            if payload:
+                changes.append((serial, port_data['port'], payload))
+            else:
+                print(f"⏭️  Skipping port {port_data['port']} on {serial} (no values set).")
+    with metrics.phase("push"):
+        return push_changes(client, args, scheduler, changes)
+
+def reconcile(client, args, inventory, scheduler, metrics):
+    state_path = args.state or f"{os.path.splitext(args.sheet)[0]}_applied.json"
+    applied = load_applied_state(state_path)
+    last_mtime = None
+    next_sweep = 0.0
+    print(f"👀 Watching {args.sheet} every {args.poll_interval:g}s, full sweep every {args.sweep_interval:g}s "
+          f"(state: {state_path}). Press Ctrl+C to stop.")
+
+    while True:
+        sweep = time.monotonic() >= next_sweep
         try:
-            put_response = session.put(url, json=payload)
-            if put_response.status_code == 200:
-                print(f"✅ Updated port {port_number} on {serial}")
+            mtime = os.stat(args.sheet).st_mtime_ns
+        except OSError as e:
+            print(f"⚠️  Cannot read {args.sheet}: {e}")
+            mtime = None
+
+        if mtime is not None and (sweep or mtime != last_mtime):
+            try:
+                switch_ports = load_sheet(args.sheet)
+            except Exception as e:
+                # Usually a sheet that is still being saved; try again on the next check
+                print(f"⚠️  Could not load {args.sheet}, retrying: {e}")
             else:
-                print(f"❌ Failed port {port_number} on {serial}: {put_response.status_code} {put_response.text}")
-        except Exception as e:
-            print(f"⚠️  Error updating port {port_number} on {serial}: {e}")
+                last_mtime = mtime
+                desired = {row_key(serial, port_data['port']): row_hash(port_data)
+                           for serial, ports in switch_ports.items() for port_data in ports}
 
-# Run switch updates in parallel (one thread per switch)
-with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-    for serial, ports in switch_ports.items():
-        executor.submit(update_switch_ports, serial, ports)
+                if sweep:
+                    print(f"\n🔁 Full sweep of {len(desired)} ports")
+                    synced = sync_ports(client, args, inventory, scheduler, metrics, switch_ports)
+                    next_sweep = time.monotonic() + args.sweep_interval
+                else:
+                    changed = defaultdict(list)
+                    for serial, ports in switch_ports.items():
+                        for port_data in ports:
+                            if applied.get(row_key(serial, port_data['port'])) != row_hash(port_data):
+                                changed[serial].append(port_data)
+                    print(f"\n📝 {args.sheet} changed: {sum(len(p) for p in changed.values())} row(s) to apply")
+                    if changed and args.org_id:
+                        with metrics.phase("discovery"):
+                            check_serials(inventory, args.org_id, changed)
+                    synced = apply_rows(client, args, scheduler, metrics, changed)
+
+                # Forget rows removed from the sheet, record the ones now in sync
+                applied = {key: value for key, value in applied.items() if key in desired}
+                applied.update({row_key(serial, port_number): desired[row_key(serial, port_number)]
+                                for serial, port_number in synced})
+                save_applied_state(state_path, applied)
+                print(f"💾 {len(applied)}/{len(desired)} rows applied")
+
+        time.sleep(args.poll_interval)
+# ====================================
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Use CLI arg or fallback to environment variable
+    api_key = args.api_key or os.getenv("MERAKI_DASHBOARD_API_KEY")
+    if not api_key:
+        raise ValueError("❌ API key is missing. Use --api-key or set MERAKI_DASHBOARD_API_KEY as an environment variable.")
+
+    # Start script timer
+    start_time = time.time()
+
+    # Shared client: pooled connections, per-org rate limiting and Retry-After handling
+    max_threads = args.max_threads
+    limiter = AdaptiveLimiter(max_threads) if args.adaptive else None
+    metrics = Metrics()
+    client = MerakiClient(api_key, limiter=limiter, metrics=metrics if args.profile else None)
+    inventory = Inventory(client, refresh=args.refresh) if args.org_id else None
+
+    scheduler = PortScheduler(
+        max_threads,
+        per_switch_limit=MAX_REQUESTS_PER_SWITCH,
+        status=(lambda: f", concurrency {client.concurrency}/{max_threads}") if args.adaptive else None
+    )
+
+    if args.reconcile:
+        try:
+            reconcile(client, args, inventory, scheduler, metrics)
+        except KeyboardInterrupt:
+            print("\n🛑 Reconcile stopped.")
+    else:
+        sync_ports(client, args, inventory, scheduler, metrics, load_sheet(args.sheet))
+
+    # End and report script duration
+    elapsed = time.time() - start_time
+    minutes, seconds = divmod(elapsed, 60)
+    print(f"\n{scheduler.summary()}")
+    print(f"⏱️ Script completed in {int(minutes)} min {int(seconds)} sec.")
+
+    if args.profile:
+        print(f"\n{format_summary(metrics.write(args.profile))}")
+        print(f"📝 Profile saved to: {args.profile}")
+
+    # Keeps the console window open when started by double-click; skipped under cron or a pipe
+    if not args.reconcile and sys.stdin.isatty():
+        input("\nPress Enter to exit...")
 
-# End and report script duration
-elapsed = time.time() - start_time
-minutes, seconds = divmod(elapsed, 60)
-print(f"\n⏱️ Script completed in {int(minutes)} min {int(seconds)} sec.")
 
-input("\nPress Enter to exit...")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from array import array
+from collections import Counter
+
+# Compact columnar store for exported clients.
+#
+# Network name, SSID and OS repeat across many rows, so they are dictionary
+# encoded: each distinct value is stored once and rows hold a small integer
+# code. IPs are nearly unique per client, so they are not: IPv4 addresses are
+# packed into 32-bit integers, as MACs are into 48-bit ones. A row costs a few
+# dozen bytes instead of a six-key dict, and pivots count codes, not strings.
+
+NO_MAC = (1 << 64) - 1
+NO_IPV4 = (1 << 32) - 1
+
+
+def pack_mac(mac):
+    try:
+        return int(mac.replace(':', '').replace('-', ''), 16)
+    except (AttributeError, ValueError):
+        return NO_MAC
+
+
+def unpack_mac(value):
+    if value == NO_MAC:
+        return None
+    digits = f"{value:012x}"
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def pack_ipv4(ip):
+    """32-bit integer for a dotted-quad IPv4 string that round-trips exactly, else NO_IPV4."""
+    parts = ip.split('.') if isinstance(ip, str) else ()
+    if len(parts) != 4 or not all(p.isdigit() and p.isascii() and (p == '0' or p[0] != '0') for p in parts):
+        return NO_IPV4
+    value = 0
+    for part in parts:
+        octet = int(part)
+        if octet > 255:
+            return NO_IPV4
+        value = value << 8 | octet
+    return value
+
+
+def unpack_ipv4(value):
+    return f"{value >> 24}.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"
+
+
+class IPColumn:
+    """IPv4 addresses packed into integers; anything else (IPv6, missing) kept per row."""
+
+    def __init__(self):
+        self.packed = array('I')
+        self.other = {}
+
+    def append(self, ip):
+        value = pack_ipv4(ip)
+        if value == NO_IPV4:
+            self.other[len(self.packed)] = ip
+        self.packed.append(value)
+
+    def __getitem__(self, row):
+        value = self.packed[row]
+        return self.other[row] if value == NO_IPV4 else unpack_ipv4(value)
+
+
+class CategoryColumn:
+    """Dictionary-encoded string column."""
+
+    def __init__(self):
+        self.values = []
+        self.index = {}
+        self.codes = array('I')
+
+    def append(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+
+class ClientStore:
+    CATEGORIES = ('Network Name', 'Device/OS Type', 'SSID')
+
+    def __init__(self):
+        self.categories = {column: CategoryColumn() for column in self.CATEGORIES}
+        self.client_names = []
+        self.macs = array('Q')
+        self.ips = IPColumn()
+
+    def __len__(self):
+        return len(self.macs)
+
+    def extend(self, rows):
+        for row in rows:
+            for column, values in self.categories.items():
+                values.append(row.get(column))
+            self.client_names.append(row.get('Client Name'))
+            self.macs.append(pack_mac(row.get('MAC Address')))
+            self.ips.append(row.get('IP Address'))
+
+    def iter_rows(self):
+        for row in range(len(self)):
+            yield {
+                'Network Name': self.categories['Network Name'][row],
+                'Client Name': self.client_names[row],
+                'MAC Address': unpack_mac(self.macs[row]),
+                'IP Address': self.ips[row],
+                'Device/OS Type': self.categories['Device/OS Type'][row],
+                'SSID': self.categories['SSID'][row],
+            }
+
+    def pivot(self, rows='SSID', columns='Device/OS Type'):
+        """Client counts by two category columns, e.g. SSID x OS.
+
+        Returns (row values, column values, {(row value, column value): count}),
+        both value lists sorted by total count descending.
+        """
+        row_category, column_category = self.categories[rows], self.categories[columns]
+        counts = Counter(zip(row_category.codes, column_category.codes))
+        row_totals, column_totals = Counter(), Counter()
+        for (r, c), count in counts.items():
+            row_totals[r] += count
+            column_totals[c] += count
+        return (
+            [row_category.values[r] for r, _ in row_totals.most_common()],
+            [column_category.values[c] for c, _ in column_totals.most_common()],
+            {(row_category.values[r], column_category.values[c]): count for (r, c), count in counts.items()},
+        )
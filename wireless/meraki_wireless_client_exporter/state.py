@@ -0,0 +1,117 @@
+import sqlite3
+import time
+
+# Local state for --incremental exports.
+#
+# Each run records when it started. A network's clients are merged into the
+# `clients` table page by page; once its last page lands the network is marked
+# complete for that run and its `last_fetch` moves to the run's start time, so
+# the next run only asks for clients seen since then (t0). A run that never
+# finished is resumed: networks already completed in it are skipped.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS networks (
+    network_id TEXT PRIMARY KEY,
+    last_fetch REAL,
+    completed_run INTEGER
+);
+CREATE TABLE IF NOT EXISTS clients (
+    network_id TEXT NOT NULL,
+    mac TEXT NOT NULL,
+    network_name TEXT,
+    client_name TEXT,
+    ip TEXT,
+    os TEXT,
+    ssid TEXT,
+    last_seen REAL,
+    PRIMARY KEY (network_id, mac)
+);
+CREATE INDEX IF NOT EXISTS clients_last_seen ON clients (last_seen);
+"""
+
+EXPORT_COLUMNS = {
+    'Network Name': 'network_name',
+    'Client Name': 'client_name',
+    'MAC Address': 'mac',
+    'IP Address': 'ip',
+    'Device/OS Type': 'os',
+    'SSID': 'ssid',
+}
+
+
+class ClientState:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.run_id = None
+        self.started = None
+
+    def begin_run(self):
+        """Resume the last unfinished run, or start a new one. Returns True when resuming."""
+        row = self.db.execute("SELECT id, started FROM runs WHERE finished IS NULL ORDER BY id DESC LIMIT 1").fetchone()
+        if row:
+            self.run_id, self.started = row
+            return True
+        self.started = time.time()
+        self.run_id = self.db.execute("INSERT INTO runs (started) VALUES (?)", (self.started,)).lastrowid
+        self.db.commit()
+        return False
+
+    def completed_in_run(self, network_id):
+        row = self.db.execute("SELECT completed_run FROM networks WHERE network_id = ?", (network_id,)).fetchone()
+        return bool(row) and row[0] == self.run_id
+
+    def last_fetch(self, network_id):
+        row = self.db.execute("SELECT last_fetch FROM networks WHERE network_id = ?", (network_id,)).fetchone()
+        return row[0] if row else None
+
+    def merge(self, network_id, rows, last_seen):
+        """Upsert one page of exported rows; `last_seen` maps MAC -> lastSeen epoch seconds."""
+        self.db.executemany(
+            """INSERT INTO clients (network_id, mac, network_name, client_name, ip, os, ssid, last_seen)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (network_id, mac) DO UPDATE SET
+                   network_name = excluded.network_name, client_name = excluded.client_name,
+                   ip = excluded.ip, os = excluded.os, ssid = excluded.ssid,
+                   last_seen = MAX(COALESCE(clients.last_seen, 0), excluded.last_seen)""",
+            [
+                (network_id, row['MAC Address'], row['Network Name'], row['Client Name'], row['IP Address'],
+                 row['Device/OS Type'], row['SSID'], last_seen.get(row['MAC Address']) or self.started)
+                for row in rows
+            ],
+        )
+
+    def complete_network(self, network_id):
+        self.db.execute(
+            """INSERT INTO networks (network_id, last_fetch, completed_run) VALUES (?, ?, ?)
+               ON CONFLICT (network_id) DO UPDATE SET
+                   last_fetch = excluded.last_fetch, completed_run = excluded.completed_run""",
+            (network_id, self.started, self.run_id),
+        )
+        self.db.commit()
+
+    def finish_run(self, cutoff):
+        """Mark the run finished and drop clients not seen since `cutoff`."""
+        self.db.execute("DELETE FROM clients WHERE last_seen < ?", (cutoff,))
+        self.db.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run_id))
+        self.db.commit()
+
+    def iter_rows(self, batch_size=1000):
+        """Yield the merged client list in batches of export rows."""
+        cursor = self.db.execute(
+            f"SELECT {', '.join(EXPORT_COLUMNS.values())} FROM clients ORDER BY network_name, mac"
+        )
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                return
+            yield [dict(zip(EXPORT_COLUMNS, values)) for values in batch]
+
+    def close(self):
+        self.db.close()
@@ -1,61 +1,135 @@
-import meraki
-import pandas as pd
+import csv
 import os
+import sys
 import time
 import argparse
+from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, wait
 
+# Make the shared meraki_auto package importable when run as a plain script
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from meraki_auto.client import MerakiClient
+from meraki_auto.concurrency import AdaptiveLimiter, ContextExecutor
+from meraki_auto.inventory import Inventory
+from meraki_auto.metrics import Metrics, format_summary
+from client_store import ClientStore
+from state import ClientState
+from writers import WRITERS, open_writer, writer_format
 
-def parse_args():
-    parser = argparse.ArgumentParser(description="Export Meraki wireless clients to Excel.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export Meraki wireless clients to Excel, CSV, JSON lines or Parquet.")
     parser.add_argument('--api-key', help='Meraki API key. Falls back to MERAKI_DASHBOARD_API_KEY if not provided.')
     parser.add_argument('--org-id', required=True, help='Meraki Organization ID')
     parser.add_argument('--days', type=int, default=7, help='Days back to include (default: 7)')
-    parser.add_argument('--output', help='Optional output Excel file path')
-    return parser.parse_args()
-
-
-def fetch_clients_for_network(dashboard, net, days_back):
-    results = []
-    net_id = net['id']
-    net_name = net['name']
-
-    if 'wireless' not in net.get('productTypes', []):
-        return results
-
-    print(f"[+] Processing: {net_name}")
-    try:
-        clients = dashboard.networks.getNetworkClients(
-            net_id,
-            timespan=days_back * 86400,
-            perPage=1000,
-            total_pages='all'
-        )
-
-        wireless_clients = 0
-        for client in clients:
-            if client.get('ssid'):
-                wireless_clients += 1
-                results.append({
-                    'Network Name': net_name,
-                    'Client Name': client.get('description') or '',
-                    'MAC Address': client.get('mac'),
-                    'IP Address': client.get('ip') or 'Unavailable',
-                    'Device/OS Type': client.get('os') or 'Unknown',
-                    'SSID': client.get('ssid')
-                })
-
-        print(f"[✓] {net_name}: {wireless_clients} wireless clients found.")
-
-    except Exception as e:
-        print(f"[!] Error with {net_name}: {e}")
-
-    return results
-
-
-def main():
-    args = parse_args()
+    parser.add_argument('--output', help='Optional output file path (format inferred from the extension)')
+    parser.add_argument('--format', choices=sorted(WRITERS), help='Output format: xlsx (default), csv, jsonl or parquet')
+    parser.add_argument('--threads', type=int, default=10, help='Worker threads; upper limit with --adaptive (default: 10)')
+    parser.add_argument('--adaptive', action='store_true', help='Adapt requests in flight to latency and 429s (AIMD)')
+    parser.add_argument('--incremental', action='store_true', help='Only fetch clients seen since the last run and merge them into local state')
+    parser.add_argument('--state', help='SQLite state file for --incremental (default: wireless_clients_state_<org_id>.db)')
+    parser.add_argument('--refresh', action='store_true', help='Re-read the network list from the API instead of the local inventory')
+    parser.add_argument('--profile', nargs='?', const='wifi_clients_profile.json', metavar='PATH', help='Write per-endpoint API timings as JSON (default wifi_clients_profile.json)')
+    parser.add_argument('--summary', action='store_true', help='Also write an SSID x OS client count pivot next to the output file')
+    return parser.parse_args(argv)
+
+
+def project_clients(net_name, page):
+    """Keep only wireless clients from one page and reduce them to the exported columns."""
+    return [
+        {
+            'Network Name': net_name,
+            'Client Name': wifi_client.get('description') or '',
+            'MAC Address': wifi_client.get('mac'),
+            'IP Address': wifi_client.get('ip') or 'Unavailable',
+            'Device/OS Type': wifi_client.get('os') or 'Unknown',
+            'SSID': wifi_client.get('ssid')
+        }
+        for wifi_client in page if wifi_client.get('ssid')
+    ]
+
+
+def fetch_client_page(client, net, url, params=None):
+    """Fetch and project one page of a network's clients.
+
+    Returns (rows, last seen per MAC, next page URL).
+    """
+    page, next_url = client.get_page(url, org_id=net.get('organizationId'), params=params)
+    last_seen = {c.get('mac'): c.get('lastSeen') for c in page if c.get('ssid')}
+    return project_clients(net['name'], page), last_seen, next_url
+
+
+def fetch_networks(client, jobs, threads, on_page, on_complete=None):
+    """Fetch the clients of every (network, params) job, handing each page to `on_page`.
+
+    Every page is its own task: when a page lands its rows are passed on
+    straight away and the next page of that network is queued behind the other
+    networks' pages, so one large network never pins a worker or its memory.
+    `on_complete(net)` runs after a network's last page.
+    """
+    with ContextExecutor(max_workers=threads) as executor:
+        pending = {}
+        found = {}
+        for net, params in jobs:
+            print(f"[+] Processing: {net['name']}")
+            found[net['id']] = 0
+            future = executor.submit(fetch_client_page, client, net, f"/networks/{net['id']}/clients", params)
+            pending[future] = net
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                net = pending.pop(future)
+                try:
+                    rows, last_seen, next_url = future.result()
+                except Exception as e:
+                    print(f"[!] Error with {net['name']}: {e}")
+                    continue
+                on_page(net, rows, last_seen)
+                found[net['id']] += len(rows)
+                if next_url:
+                    pending[executor.submit(fetch_client_page, client, net, next_url)] = net
+                    continue
+                if on_complete:
+                    on_complete(net)
+                concurrency = f" (concurrency {client.concurrency})" if client.limiter else ""
+                print(f"[✓] {net['name']}: {found[net['id']]} wireless clients found.{concurrency}")
+
+
+def incremental_jobs(state, networks, window_start):
+    """Ask each network only for clients seen since its last completed fetch."""
+    jobs = []
+    for net in networks:
+        if state.completed_in_run(net['id']):
+            print(f"[=] {net['name']}: already fetched in this run, skipping.")
+            continue
+        since = state.last_fetch(net['id'])
+        if since and since > window_start:
+            jobs.append((net, {'t0': int(since), 'perPage': 1000}))
+        else:
+            jobs.append((net, {'t0': int(window_start), 'perPage': 1000}))
+    return jobs
+
+
+def write_summary(store, path):
+    """Write the SSID x OS client count pivot as CSV and print the top SSIDs."""
+    ssids, oses, counts = store.pivot('SSID', 'Device/OS Type')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['SSID'] + oses + ['Total'])
+        for ssid in ssids:
+            row = [counts.get((ssid, os_type), 0) for os_type in oses]
+            writer.writerow([ssid] + row + [sum(row)])
+
+    print("\n📊 Clients per SSID:")
+    for ssid in ssids[:10]:
+        print(f"   {ssid}: {sum(counts.get((ssid, os_type), 0) for os_type in oses)}")
+    print(f"   Full SSID x OS summary: {path}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
     api_key = args.api_key or os.getenv('MERAKI_DASHBOARD_API_KEY')
     if not api_key:
         print("❌ API key is required. Use --api-key or set MERAKI_DASHBOARD_API_KEY.")
@@ -64,31 +138,70 @@ def main():
     org_id = args.org_id
     days_back = args.days
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    output_file = args.output or os.path.join(os.getcwd(), f'wireless_clients_{timestamp}.xlsx')
+    output_file = args.output or os.path.join(os.getcwd(), f'wireless_clients_{timestamp}.{args.format or "xlsx"}')
+    # Checked before any API calls, not after the clients have been fetched
+    writer_format(output_file, args.format)
 
-    dashboard = meraki.DashboardAPI(api_key, suppress_logging=True)
+    metrics = Metrics()
+    client = MerakiClient(
+        api_key,
+        limiter=AdaptiveLimiter(args.threads) if args.adaptive else None,
+        metrics=metrics if args.profile else None,
+    )
 
     start_time = time.perf_counter()
-    all_data = []
-
-    print("Fetching network list...")
-    networks = dashboard.organizations.getOrganizationNetworks(org_id)
-    print(f"Found {len(networks)} networks.")
-
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_network = {
-            executor.submit(fetch_clients_for_network, dashboard, net, days_back): net['name']
-            for net in networks
-        }
-        for future in as_completed(future_to_network):
-            all_data.extend(future.result())
-
-    df = pd.DataFrame(all_data)
-    df.to_excel(output_file, index=False)
 
-    print(f"\n✅ Done. {len(df)} wireless clients exported to:\n{output_file}")
+    with metrics.phase('discovery'):
+        print("Fetching network list...")
+        networks = Inventory(client, refresh=args.refresh).networks(org_id)
+        print(f"Found {len(networks)} networks.")
+
+    wireless_networks = [net for net in networks if 'wireless' in net.get('productTypes', [])]
+    # Summary pivots need every row; they are kept in the compact columnar store
+    store = ClientStore() if args.summary else None
+
+    def export(writer, rows):
+        writer.write_rows(rows)
+        if store is not None:
+            store.extend(rows)
+
+    if args.incremental:
+        state = ClientState(args.state or f"wireless_clients_state_{org_id}.db")
+        try:
+            if state.begin_run():
+                print("🔁 Resuming the last interrupted incremental run.")
+            window_start = state.started - days_back * 86400
+            jobs = incremental_jobs(state, wireless_networks, window_start)
+            with metrics.phase('clients'):
+                fetch_networks(
+                    client, jobs, args.threads,
+                    on_page=lambda net, rows, last_seen: state.merge(net['id'], rows, last_seen),
+                    on_complete=lambda net: state.complete_network(net['id']),
+                )
+            state.finish_run(window_start)
+            # The export is the merged state: every client seen in the --days window
+            with metrics.phase('export'), open_writer(output_file, args.format) as writer:
+                for rows in state.iter_rows():
+                    export(writer, rows)
+        finally:
+            state.close()
+    else:
+        params = {'timespan': days_back * 86400, 'perPage': 1000}
+        # The writer is closed even if the run fails
+        with metrics.phase('clients'), open_writer(output_file, args.format) as writer:
+            fetch_networks(
+                client, [(net, params) for net in wireless_networks], args.threads,
+                on_page=lambda net, rows, last_seen: export(writer, rows),
+            )
+
+    print(f"\n✅ Done. {writer.rows_written} wireless clients exported to:\n{output_file}")
+    if store is not None:
+        write_summary(store, str(Path(output_file).with_suffix('')) + '_summary.csv')
     elapsed = time.perf_counter() - start_time
     print(f"⏱️ Elapsed time: {elapsed:.2f} seconds")
+    if args.profile:
+        print(f"\n{format_summary(metrics.write(args.profile))}")
+        print(f"📝 Profile saved to: {args.profile}")
 
 
 if __name__ == "__main__":
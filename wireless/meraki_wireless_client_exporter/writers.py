@@ -0,0 +1,131 @@
+import csv
+import json
+from pathlib import Path
+
+# Streaming output writers. Rows are written as each network finishes, so
+# memory stays flat and everything exported so far survives a late failure.
+
+COLUMNS = ['Network Name', 'Client Name', 'MAC Address', 'IP Address', 'Device/OS Type', 'SSID']
+
+
+class RowWriter:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.rows_written = 0
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvWriter(RowWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = open(self.path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesWriter(RowWriter):
+    def __init__(self, path):
+        super().__init__(path)
+        self.file = open(self.path, 'w', encoding='utf-8')
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(RowWriter):
+    """Buffers up to `row_group_size` rows and writes each batch as a Parquet row group."""
+
+    def __init__(self, path, row_group_size=50000):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow. Install it with: pip install pyarrow")
+        self.pa = pa
+        self.schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+        self.writer = pq.ParquetWriter(str(self.path), self.schema)
+        self.row_group_size = row_group_size
+        self.buffer = []
+
+    def write_rows(self, rows):
+        self.buffer.extend(rows)
+        self.rows_written += len(rows)
+        if len(self.buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+class XlsxWriter(RowWriter):
+    """openpyxl write-only workbook: rows stream to a temp file and are saved on close."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        import openpyxl
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet('Wireless Clients')
+        self.sheet.append(COLUMNS)
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.sheet.append([row.get(column) for column in COLUMNS])
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonLinesWriter,
+    'parquet': ParquetWriter,
+    'xlsx': XlsxWriter,
+}
+
+
+def writer_format(path, fmt=None):
+    """`fmt`, or the format named by the file extension. Exits on anything unsupported."""
+    fmt = fmt or Path(path).suffix.lstrip('.').lower()
+    if fmt not in WRITERS:
+        supported = ', '.join(sorted(WRITERS))
+        raise SystemExit(f"❌ Can't tell the output format of '{Path(path).name}'. "
+                         f"Use a file ending in one of {supported}, or pass --format ({supported}).")
+    return fmt
+
+
+def open_writer(path, fmt=None):
+    """Open a writer for `fmt`, or for the format named by the file extension."""
+    return WRITERS[writer_format(path, fmt)](path)